@@ -44,12 +44,14 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
+    'whitenoise.runserver_nostatic',
     'django.contrib.staticfiles',
     'Navy_registrar',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -89,6 +91,63 @@ DATABASES = {
 }
 
 
+# Cache
+# Shared by all worker processes; used for per-user turn locks, idempotent results and
+# admission control. Production deployments should set REDIS_URL; without it the cache
+# lives in a database table created with `python manage.py createcachetable`.
+
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+    # Sessions are written through to the database and read from Redis, and authenticated
+    # users are served from Redis (see Navy_registrar.backends), so a logged-in request
+    # makes no session or auth_user queries.
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    AUTHENTICATION_BACKENDS = ['Navy_registrar.backends.CachedModelBackend']
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'navy_registrar_cache',
+        }
+    }
+    # Caching sessions and users in a database table saves no queries, so read them directly.
+    SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+    AUTHENTICATION_BACKENDS = ['django.contrib.auth.backends.ModelBackend']
+
+AUTH_USER_CACHE_TTL = 300
+
+# Lease length for the per-user turn lock and turn slots. Leases are renewed while a turn
+# runs, so this only bounds how long a crashed worker keeps them.
+CHATBOT_TURN_LOCK_TIMEOUT = 120
+# How long a duplicate submission waits for the in-flight run with the same idempotency key.
+CHATBOT_IN_FLIGHT_WAIT = 60
+CHATBOT_IDEMPOTENCY_TTL = 3600
+
+# Admission control: token bucket (capacity, refill tokens per second) per priority class,
+# plus a deployment-wide ceiling on concurrent turns with slots reserved for staff.
+CHATBOT_RATE_LIMITS = {
+    'staff': (20, 1 / 3),
+    'default': (5, 1 / 12),
+}
+CHATBOT_MAX_CONCURRENT_TURNS = 8
+CHATBOT_STAFF_RESERVED_TURNS = 2
+
+# Near-duplicate question cache: TF-IDF cosine similarity required to reuse an answer,
+# and the number of answers kept before least recently used ones are evicted.
+QUESTION_CACHE_SIMILARITY_THRESHOLD = 0.8
+QUESTION_CACHE_MAX_ENTRIES = 1000
+
+# Chatbot API v2 (X-API-Version: 2) responses at or above this many bytes are gzip/brotli compressed.
+API_COMPRESSION_THRESHOLD = 1024
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -117,9 +176,21 @@ USE_I18N = True
 USE_TZ = True
 
 STATIC_URL = 'static/'
-STATIC_ROOT = BASE_DIR / 'Navy_registrar/static'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
 # STATICFILES_DIRS = [BASE_DIR / 'Navy_registrar/static']
 
+# collectstatic writes content-hashed copies plus .gz/.br variants of every asset;
+# WhiteNoise serves them from the app server, with far-future immutable cache headers
+# for the hashed names.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGGING = {
@@ -149,5 +220,20 @@ LOGGING = {
             'level': 'DEBUG',
             'propagate': False,
         },
+        'Navy_registrar.exports': {
+            'handlers': ['console'],
+            'level': 'DEBUG',
+            'propagate': False,
+        },
+        'Navy_registrar.structured_output': {
+            'handlers': ['console'],
+            'level': 'DEBUG',
+            'propagate': False,
+        },
+        'Navy_registrar.concurrency': {
+            'handlers': ['console'],
+            'level': 'DEBUG',
+            'propagate': False,
+        },
     },
 }
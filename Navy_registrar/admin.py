@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import ShipInformation, CrewInformation, MissionInformation, PortInformation, Conversation
+from .models import ShipInformation, CrewInformation, MissionInformation, PortInformation, Conversation, QuestionAnswer
+from .question_cache import cache_stats
+from .structured_output import parse_stats
 
 @admin.register(ShipInformation)
 class ShipInformationAdmin(admin.ModelAdmin):
@@ -20,4 +22,28 @@ class PortInformationAdmin(admin.ModelAdmin):
 @admin.register(Conversation)
 class ConversationAdmin(admin.ModelAdmin):
     list_display = ('user', 'timestamp')
-    list_filter = ('user', 'timestamp')
\ No newline at end of file
+    list_filter = ('user', 'timestamp')
+
+    def changelist_view(self, request, extra_context=None):
+        stats = parse_stats()
+        self.message_user(
+            request,
+            f"Analysis parse failure rate: {stats['failure_rate']:.1%}, "
+            f"retries per turn: {stats['retries_per_turn']:.2f} "
+            f"({stats['turns']} turns, {stats['repairs']} local repairs, {stats['retries']} retries, {stats['failures']} failures)"
+        )
+        return super().changelist_view(request, extra_context)
+
+@admin.register(QuestionAnswer)
+class QuestionAnswerAdmin(admin.ModelAdmin):
+    list_display = ('question', 'hit_count', 'created', 'last_used')
+    ordering = ('-hit_count',)
+    search_fields = ('question',)
+
+    def changelist_view(self, request, extra_context=None):
+        stats = cache_stats()
+        self.message_user(
+            request,
+            f"Question cache hit rate: {stats['hit_rate']:.1%} ({stats['hits']} hits, {stats['misses']} misses)"
+        )
+        return super().changelist_view(request, extra_context)
\ No newline at end of file
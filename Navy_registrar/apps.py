@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class NavyRegistrarConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Navy_registrar'
+
+    def ready(self):
+        from . import backends  # noqa: F401  (connects user cache invalidation)
\ No newline at end of file
@@ -0,0 +1,34 @@
+import logging
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+USER_CACHE_TTL = getattr(settings, 'AUTH_USER_CACHE_TTL', 300)
+
+def user_cache_key(user_pk) -> str:
+    return f"auth:user:{user_pk}"
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend that serves the session's user from the cache instead of auth_user."""
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, USER_CACHE_TTL)
+            return user
+        return user if self.user_can_authenticate(user) else None
+
+# Invalidation so password, staff and active flag changes apply immediately
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    cache.delete(user_cache_key(instance.pk))
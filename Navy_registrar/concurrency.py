@@ -0,0 +1,178 @@
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Optional
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+TURN_LOCK_TIMEOUT = getattr(settings, 'CHATBOT_TURN_LOCK_TIMEOUT', 120)
+IN_FLIGHT_WAIT = getattr(settings, 'CHATBOT_IN_FLIGHT_WAIT', 60)
+IN_FLIGHT_POLL_INTERVAL = 0.25
+IDEMPOTENCY_TTL = getattr(settings, 'CHATBOT_IDEMPOTENCY_TTL', 3600)
+# Token bucket (capacity, refill tokens per second) per priority class
+RATE_LIMITS = getattr(settings, 'CHATBOT_RATE_LIMITS', {
+    'staff': (20, 1 / 3),
+    'default': (5, 1 / 12),
+})
+MAX_CONCURRENT_TURNS = getattr(settings, 'CHATBOT_MAX_CONCURRENT_TURNS', 8)
+STAFF_RESERVED_TURNS = getattr(settings, 'CHATBOT_STAFF_RESERVED_TURNS', 2)
+SATURATED_RETRY_AFTER = 5
+TURN_BUSY_RETRY_AFTER = 5
+
+# Leases
+@contextmanager
+def renewed_lease(key: str, token: str, timeout: int):
+    """Extend a held lease every ``timeout / 3`` seconds until the block exits.
+
+    A turn makes an unbounded number of sequential LLM calls, so a fixed lease
+    could expire while it runs and admit a second turn. With renewal the
+    timeout only bounds how long a dead worker keeps the lease.
+    """
+    stopped = threading.Event()
+
+    def renew():
+        try:
+            while not stopped.wait(timeout / 3):
+                if cache.get(key) != token or not cache.touch(key, timeout):
+                    logger.warning(f"Lease {key} was lost before the turn finished")
+                    return
+        finally:
+            # The database cache backend opens a connection for this thread
+            connections.close_all()
+
+    renewer = threading.Thread(target=renew, name=f"renew {key}", daemon=True)
+    renewer.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        renewer.join()
+
+# Per-user turn lock
+@contextmanager
+def user_turn_lock(user_pk, timeout: int = TURN_LOCK_TIMEOUT):
+    """Serialize chatbot turns for one user across worker processes.
+
+    The lock is a cache lease taken with ``cache.add`` so it is shared by every
+    process using the same cache backend. It is renewed while held and expires
+    after ``timeout`` seconds if the holder dies. Yields whether the lease was
+    acquired; callers should reject rather than wait when it is held.
+    """
+    key = f"chatbot:turn-lock:{user_pk}"
+    token = uuid.uuid4().hex
+    acquired = cache.add(key, token, timeout)
+    try:
+        if acquired:
+            with renewed_lease(key, token, timeout):
+                yield True
+        else:
+            yield False
+    finally:
+        # Only release the lease we own; an expired lease may have been re-taken
+        if acquired and cache.get(key) == token:
+            cache.delete(key)
+
+# Idempotent results
+def idempotency_cache_key(user_pk, idempotency_key: str, user_input: str) -> str:
+    digest = hashlib.sha256(f"{idempotency_key}:{user_input}".encode('utf-8')).hexdigest()
+    return f"chatbot:idempotency:{user_pk}:{digest}"
+
+def get_idempotent_result(cache_key: Optional[str]) -> Optional[dict]:
+    if not cache_key:
+        return None
+    return cache.get(cache_key)
+
+def mark_in_flight(cache_key: Optional[str]):
+    # Duplicates arriving after the marker expires are rejected and retry later
+    if cache_key:
+        cache.set(f"{cache_key}:in-flight", True, TURN_LOCK_TIMEOUT)
+
+def clear_in_flight(cache_key: Optional[str]):
+    if cache_key:
+        cache.delete(f"{cache_key}:in-flight")
+
+def wait_for_idempotent_result(cache_key: Optional[str], wait: float = IN_FLIGHT_WAIT) -> Optional[dict]:
+    """Wait for a run with the same idempotency key that is already in flight.
+
+    Returns ``None`` straight away when no such run exists, or when it ends
+    without a cacheable result.
+    """
+    if not cache_key:
+        return None
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        response = cache.get(cache_key)
+        if response is not None:
+            return response
+        if not cache.get(f"{cache_key}:in-flight"):
+            return None
+        time.sleep(IN_FLIGHT_POLL_INTERVAL)
+    return None
+
+def store_idempotent_result(cache_key: Optional[str], response: dict):
+    # Error outcomes are transient, so a resubmission must run the turn again
+    if cache_key and "message" not in response:
+        cache.set(cache_key, response, IDEMPOTENCY_TTL)
+
+# Admission control
+def priority_class(user) -> str:
+    return 'staff' if user.is_staff else 'default'
+
+def check_rate_limit(user) -> Optional[float]:
+    """Take one token from the user's bucket.
+
+    Returns ``None`` when the turn is admitted, otherwise the number of seconds
+    until a token is available. The read-modify-write is not atomic, so callers
+    must hold the user's turn lock.
+    """
+    capacity, refill_rate = RATE_LIMITS[priority_class(user)]
+    key = f"chatbot:bucket:{user.pk}"
+    now = time.time()
+    bucket = cache.get(key) or {'tokens': capacity, 'updated': now}
+    tokens = min(capacity, bucket['tokens'] + (now - bucket['updated']) * refill_rate)
+    retry_after = None
+    if tokens >= 1:
+        tokens -= 1
+    else:
+        retry_after = (1 - tokens) / refill_rate
+    cache.set(key, {'tokens': tokens, 'updated': now}, int(capacity / refill_rate) + 60)
+    return retry_after
+
+@contextmanager
+def concurrency_slot(user, timeout: int = TURN_LOCK_TIMEOUT):
+    """Hold one of the deployment-wide turn slots while the supergraph runs.
+
+    Regular users may only take the first ``MAX_CONCURRENT_TURNS -
+    STAFF_RESERVED_TURNS`` slots; staff may take any and try the reserved ones
+    first. The slot is renewed while held. Yields whether a slot was free;
+    callers should reject rather than wait.
+    """
+    if priority_class(user) == 'staff':
+        slots = reversed(range(MAX_CONCURRENT_TURNS))
+    else:
+        slots = range(max(MAX_CONCURRENT_TURNS - STAFF_RESERVED_TURNS, 0))
+    token = uuid.uuid4().hex
+    acquired_key = None
+    for slot in slots:
+        key = f"chatbot:turn-slot:{slot}"
+        if cache.add(key, token, timeout):
+            acquired_key = key
+            break
+    if acquired_key is None:
+        logger.warning(f"No free turn slot for user {user.pk} ({priority_class(user)})")
+    try:
+        if acquired_key:
+            with renewed_lease(acquired_key, token, timeout):
+                yield True
+        else:
+            yield False
+    finally:
+        if acquired_key and cache.get(acquired_key) == token:
+            cache.delete(acquired_key)
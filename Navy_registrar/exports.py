@@ -0,0 +1,125 @@
+import csv
+import json
+import zlib
+import logging
+from datetime import datetime
+from typing import Iterator, Optional
+from django.core.serializers.json import DjangoJSONEncoder
+from .models import ShipInformation, CrewInformation, MissionInformation, PortInformation, Conversation
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 2000
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+SHIP_FIELDS = ['ship_id', 'ship_name', 'ship_type', 'updated_at', 'crew', 'missions', 'ports']
+CONVERSATION_FIELDS = ['id', 'username', 'timestamp', 'data']
+
+# Row Sources
+def _group_by_ship(rows) -> dict:
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row.pop('ship_id'), []).append(row)
+    return grouped
+
+def ship_rows(since: Optional[datetime] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[dict]:
+    """Yield ships with their crew, missions and ports.
+
+    Ships are read in keyset-paginated pages ordered by primary key, and the
+    related rows for each page are fetched with one query per table.
+    """
+    queryset = ShipInformation.objects.order_by('ship_id')
+    if since:
+        queryset = queryset.filter(updated_at__gte=since)
+    last_pk = None
+    while True:
+        page_queryset = queryset if last_pk is None else queryset.filter(ship_id__gt=last_pk)
+        page = list(page_queryset.values('ship_id', 'ship_name', 'ship_type', 'updated_at')[:chunk_size])
+        if not page:
+            return
+        ids = [row['ship_id'] for row in page]
+        crew = _group_by_ship(
+            CrewInformation.objects.filter(ship_id__in=ids).order_by('id')
+            .values('ship_id', 'crew_size', 'commander_name', 'commander_rank')
+        )
+        missions = _group_by_ship(
+            MissionInformation.objects.filter(ship_id__in=ids).order_by('id').values('ship_id', 'mission_type')
+        )
+        ports = _group_by_ship(
+            PortInformation.objects.filter(ship_id__in=ids).order_by('id').values('ship_id', 'home_port')
+        )
+        for row in page:
+            ship_id = row['ship_id']
+            yield {
+                'ship_id': str(ship_id),
+                'ship_name': row['ship_name'],
+                'ship_type': row['ship_type'],
+                'updated_at': row['updated_at'].isoformat(),
+                'crew': crew.get(ship_id, []),
+                'missions': [mission['mission_type'] for mission in missions.get(ship_id, [])],
+                'ports': [port['home_port'] for port in ports.get(ship_id, [])],
+            }
+        last_pk = ids[-1]
+
+def conversation_rows(since: Optional[datetime] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[dict]:
+    queryset = Conversation.objects.order_by('id')
+    if since:
+        queryset = queryset.filter(timestamp__gte=since)
+    rows = queryset.values('id', 'user__username', 'timestamp', 'data').iterator(chunk_size=chunk_size)
+    for row in rows:
+        yield {
+            'id': row['id'],
+            'username': row['user__username'],
+            'timestamp': row['timestamp'].isoformat(),
+            'data': row['data'],
+        }
+
+DATASETS = {
+    'ships': (ship_rows, SHIP_FIELDS),
+    'conversations': (conversation_rows, CONVERSATION_FIELDS),
+}
+
+# Encoders
+class Echo:
+    """File-like object whose write returns the value, for streaming csv.writer output."""
+
+    def write(self, value):
+        return value
+
+def render_jsonl(rows: Iterator[dict], fields: list) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, separators=(',', ':')) + "\n"
+
+def render_csv(rows: Iterator[dict], fields: list) -> Iterator[str]:
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([
+            json.dumps(row[field], cls=DjangoJSONEncoder) if isinstance(row[field], (dict, list)) else row[field]
+            for field in fields
+        ])
+
+RENDERERS = {
+    'csv': render_csv,
+    'jsonl': render_jsonl,
+}
+
+def gzip_stream(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export_stream(dataset: str, fmt: str = 'jsonl', since: Optional[datetime] = None,
+                  compress: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Encode a dataset as a lazy stream of bytes; memory use does not grow with table size."""
+    row_source, fields = DATASETS[dataset]
+    logger.info(f"Exporting {dataset} as {fmt} (since={since}, gzip={compress})")
+    chunks = (text.encode('utf-8') for text in RENDERERS[fmt](row_source(since, chunk_size), fields))
+    return gzip_stream(chunks) if compress else chunks
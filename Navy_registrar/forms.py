@@ -4,4 +4,9 @@ class ChatbotForm(forms.Form):
     user_input = forms.CharField(
         widget=forms.Textarea(attrs={'rows': 4, 'class': 'form-control'}),
         label='Enter your query'
+    )
+    idempotency_key = forms.CharField(
+        widget=forms.HiddenInput(),
+        required=False,
+        max_length=64
     )
\ No newline at end of file
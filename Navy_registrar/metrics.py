@@ -0,0 +1,13 @@
+from django.core.cache import cache
+
+# Counters shared by all worker processes through the default cache
+def increment(key: str):
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add and incr
+        cache.set(key, 1, None)
+
+def read(key: str) -> int:
+    return cache.get(key, 0)
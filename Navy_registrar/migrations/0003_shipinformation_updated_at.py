@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Navy_registrar', '0002_questionanswer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shipinformation',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
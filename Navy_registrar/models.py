@@ -6,6 +6,7 @@ class ShipInformation(models.Model):
     ship_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     ship_name = models.CharField(max_length=255)
     ship_type = models.CharField(max_length=255)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = "Ship Information"
@@ -47,4 +48,18 @@ class Conversation(models.Model):
 
     class Meta:
         verbose_name = "Conversation"
-        verbose_name_plural = "Conversations"
\ No newline at end of file
+        verbose_name_plural = "Conversations"
+
+class QuestionAnswer(models.Model):
+    question = models.TextField()
+    answer = models.TextField()
+    hit_count = models.PositiveIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+    last_used = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.question[:80]
+
+    class Meta:
+        verbose_name = "Cached Answer"
+        verbose_name_plural = "Cached Answers"
\ No newline at end of file
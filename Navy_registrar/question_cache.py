@@ -0,0 +1,142 @@
+import math
+import re
+import logging
+import threading
+from collections import Counter
+from typing import Optional
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from .metrics import increment, read
+from .models import QuestionAnswer
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+SIMILARITY_THRESHOLD = getattr(settings, 'QUESTION_CACHE_SIMILARITY_THRESHOLD', 0.8)
+MAX_ENTRIES = getattr(settings, 'QUESTION_CACHE_MAX_ENTRIES', 1000)
+HITS_KEY = "chatbot:question-cache:hits"
+MISSES_KEY = "chatbot:question-cache:misses"
+
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "been", "do", "does", "did",
+    "what", "whats", "which", "who", "whom", "how", "why", "when", "where", "can", "could",
+    "would", "should", "will", "of", "for", "to", "in", "on", "at", "by", "with", "about",
+    "and", "or", "it", "its", "this", "that", "these", "those", "i", "me", "my", "we", "our",
+    "you", "your", "please", "tell", "explain", "s", "there", "typically", "usually",
+}
+
+# Tokenization
+def tokenize(text: str) -> list:
+    tokens = []
+    for token in re.findall(r"[a-z0-9]+", text.lower().replace("'", "")):
+        if token in STOPWORDS:
+            continue
+        # Light stemming so "frigates" and "frigate" share a term
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+def shingles(text: str) -> Counter:
+    """Words plus adjacent word pairs, so word order and negation change the vector."""
+    tokens = tokenize(text)
+    return Counter(tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])])
+
+# Similarity Index
+class QuestionIndex:
+    """In-process TF-IDF index over the words and word pairs of cached questions, synced from the database.
+
+    Rows created by other worker processes are picked up incrementally on the
+    next lookup; rows evicted elsewhere are dropped when a hit finds them gone.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.terms = {}
+        self.postings = {}
+        self.last_id = 0
+
+    def sync(self):
+        new_rows = QuestionAnswer.objects.filter(id__gt=self.last_id).order_by('id').values_list('id', 'question')
+        for pk, question in new_rows:
+            self.add(pk, question)
+
+    def add(self, pk: int, question: str):
+        with self.lock:
+            terms = shingles(question)
+            self.terms[pk] = terms
+            for term in terms:
+                self.postings.setdefault(term, set()).add(pk)
+            self.last_id = max(self.last_id, pk)
+
+    def remove(self, pk: int):
+        with self.lock:
+            for term in self.terms.pop(pk, {}):
+                postings = self.postings.get(term)
+                if postings:
+                    postings.discard(pk)
+                    if not postings:
+                        del self.postings[term]
+
+    def idf(self, term: str) -> float:
+        return math.log((1 + len(self.terms)) / (1 + len(self.postings.get(term, ())))) + 1
+
+    def vector(self, terms: Counter) -> dict:
+        vector = {term: count * self.idf(term) for term, count in terms.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return {term: weight / norm for term, weight in vector.items()} if norm else {}
+
+    def best_match(self, question: str) -> tuple:
+        """Return ``(pk, cosine similarity)`` of the closest cached question."""
+        with self.lock:
+            query = self.vector(shingles(question))
+            candidates = set()
+            for term in query:
+                candidates |= self.postings.get(term, set())
+            best_pk, best_score = None, 0.0
+            for pk in candidates:
+                document = self.vector(self.terms[pk])
+                score = sum(weight * document.get(term, 0.0) for term, weight in query.items())
+                if score > best_score:
+                    best_pk, best_score = pk, score
+            return best_pk, best_score
+
+question_index = QuestionIndex()
+
+# Cache API
+def lookup_answer(question: str) -> Optional[str]:
+    question_index.sync()
+    pk, score = question_index.best_match(question)
+    if pk is not None and score >= SIMILARITY_THRESHOLD:
+        updated = QuestionAnswer.objects.filter(pk=pk).update(hit_count=F('hit_count') + 1, last_used=timezone.now())
+        if updated:
+            answer = QuestionAnswer.objects.filter(pk=pk).values_list('answer', flat=True).first()
+            if answer is not None:
+                increment(HITS_KEY)
+                logger.debug(f"Question cache hit ({score:.2f}) for '{question}'")
+                return answer
+        # Evicted by another process
+        question_index.remove(pk)
+    increment(MISSES_KEY)
+    return None
+
+def store_answer(question: str, answer: str):
+    entry = QuestionAnswer.objects.create(question=question, answer=answer)
+    question_index.add(entry.pk, question)
+    evict()
+
+def evict():
+    """Drop least recently used entries beyond ``MAX_ENTRIES``."""
+    stale = list(QuestionAnswer.objects.order_by('-last_used', '-id').values_list('id', flat=True)[MAX_ENTRIES:])
+    if stale:
+        QuestionAnswer.objects.filter(id__in=stale).delete()
+        for pk in stale:
+            question_index.remove(pk)
+        logger.info(f"Evicted {len(stale)} cached answers")
+
+def cache_stats() -> dict:
+    hits = read(HITS_KEY)
+    misses = read(MISSES_KEY)
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "hit_rate": hits / total if total else 0.0}
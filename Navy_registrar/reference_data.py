@@ -0,0 +1,217 @@
+import re
+import logging
+from typing import Optional
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Reference Tables
+# Officer ranks from most junior to most senior, with common abbreviations
+RANKS = [
+    ("Midshipman", ["midshipman", "ensign", "acting sub lieutenant"]),
+    ("Sub Lieutenant", ["sub lieutenant", "sub lt", "lieutenant junior grade", "ltjg", "lt jg"]),
+    ("Lieutenant", ["lieutenant", "lt"]),
+    ("Lieutenant Commander", ["lieutenant commander", "lt cdr", "lcdr", "lt commander"]),
+    ("Commander", ["commander", "cdr"]),
+    ("Captain", ["captain", "capt"]),
+    ("Commodore", ["commodore", "cdre", "rear admiral lower half"]),
+    ("Rear Admiral", ["rear admiral", "radm"]),
+    ("Vice Admiral", ["vice admiral", "vadm"]),
+    ("Admiral", ["admiral", "adm"]),
+    ("Fleet Admiral", ["fleet admiral", "admiral of the fleet"]),
+]
+
+# Ship type: (aliases, class, minimum crew size, minimum commanding rank)
+SHIP_TYPES = {
+    "Aircraft Carrier": (["aircraft carrier", "carrier", "supercarrier", "cvn", "cv"], "capital", 1500, "Captain"),
+    "Amphibious Assault Ship": (["amphibious assault ship", "landing helicopter dock", "lhd", "lha"], "amphibious", 800, "Captain"),
+    "Landing Ship": (["landing ship", "landing platform dock", "lpd", "lst", "dock landing ship"], "amphibious", 150, "Commander"),
+    "Cruiser": (["cruiser", "guided missile cruiser", "cg"], "surface combatant", 300, "Captain"),
+    "Destroyer": (["destroyer", "guided missile destroyer", "ddg", "dd"], "surface combatant", 200, "Commander"),
+    "Frigate": (["frigate", "guided missile frigate", "ffg", "ff"], "surface combatant", 120, "Commander"),
+    "Corvette": (["corvette", "anti submarine warfare corvette"], "surface combatant", 60, "Lieutenant Commander"),
+    "Patrol Vessel": (["patrol vessel", "offshore patrol vessel", "patrol boat", "opv", "fast attack craft"], "patrol", 20, "Lieutenant"),
+    "Mine Countermeasures Vessel": (["mine countermeasures vessel", "minesweeper", "minehunter", "mcm"], "mine warfare", 40, "Lieutenant Commander"),
+    "Ballistic Missile Submarine": (["ballistic missile submarine", "ssbn", "nuclear ballistic missile submarine"], "strategic", 95, "Captain"),
+    "Attack Submarine": (["attack submarine", "nuclear attack submarine", "ssn", "hunter killer submarine"], "submarine", 90, "Commander"),
+    "Submarine": (["submarine", "diesel electric submarine", "ssk", "conventional submarine"], "submarine", 35, "Lieutenant Commander"),
+    "Replenishment Ship": (["replenishment ship", "fleet tanker", "fleet oiler", "supply ship", "auxiliary", "tanker"], "support", 80, "Commander"),
+}
+
+# Mission type: (aliases, base priority level)
+MISSION_TYPES = {
+    "Strategic Deterrence": (["deterrence", "strategic deterrence", "nuclear deterrence", "deterrent patrol"], 4),
+    "Combat": (["combat", "strike", "war", "warfare", "offensive", "assault", "attack"], 4),
+    "Anti-Submarine Warfare": (["anti submarine warfare", "asw", "submarine hunting"], 3),
+    "Air Defense": (["air defense", "air defence", "ballistic missile defense", "ballistic missile defence"], 3),
+    "Blockade": (["blockade", "interdiction", "sea denial"], 3),
+    "Amphibious Operation": (["amphibious operation", "amphibious landing", "beach landing"], 3),
+    "Mine Clearance": (["mine clearance", "mine countermeasures", "minesweeping", "demining"], 3),
+    "Evacuation": (["evacuation", "non combatant evacuation", "neo"], 3),
+    "Escort": (["escort", "convoy escort", "carrier escort", "convoy"], 2),
+    "Reconnaissance": (["reconnaissance", "recon", "surveillance", "intelligence gathering", "isr"], 2),
+    "Anti-Piracy": (["anti piracy", "counter piracy", "maritime security"], 2),
+    "Search and Rescue": (["search and rescue", "sar", "rescue"], 2),
+    "Humanitarian Assistance": (["humanitarian assistance", "humanitarian", "disaster relief", "hadr"], 2),
+    "Patrol": (["patrol", "coastal patrol", "border patrol", "presence"], 1),
+    "Logistics": (["logistics", "resupply", "replenishment", "transport", "supply"], 1),
+    "Training": (["training", "exercise", "drill", "sea trials", "trials"], 0),
+    "Goodwill Visit": (["goodwill visit", "port visit", "diplomatic visit", "ceremonial"], 0),
+}
+
+PRIORITY_LEVELS = ["Low", "Moderate", "High", "Very High", "Critical"]
+
+# Ship class and mission pairs that are a core role, raising priority one level
+CORE_ROLES = {
+    ("strategic", "Strategic Deterrence"),
+    ("capital", "Combat"),
+    ("capital", "Air Defense"),
+    ("surface combatant", "Air Defense"),
+    ("surface combatant", "Escort"),
+    ("surface combatant", "Anti-Submarine Warfare"),
+    ("submarine", "Anti-Submarine Warfare"),
+    ("submarine", "Reconnaissance"),
+    ("amphibious", "Amphibious Operation"),
+    ("amphibious", "Humanitarian Assistance"),
+    ("amphibious", "Evacuation"),
+    ("mine warfare", "Mine Clearance"),
+    ("patrol", "Anti-Piracy"),
+    ("patrol", "Patrol"),
+    ("support", "Logistics"),
+}
+
+# Home port: (aliases, strategic advantage)
+PORTS = {
+    "Visakhapatnam": (["visakhapatnam", "vizag", "eastern naval command"], "Bay of Bengal access, Eastern Naval Command headquarters"),
+    "Mumbai": (["mumbai", "bombay", "western naval command"], "Arabian Sea access, Western Naval Command headquarters"),
+    "Kochi": (["kochi", "cochin", "southern naval command"], "Southern Indian Ocean approaches, training and repair hub"),
+    "Karwar": (["karwar", "ins kadamba", "kadamba"], "Deep-water Arabian Sea base, sheltered fleet anchorage"),
+    "Port Blair": (["port blair", "andaman", "andaman and nicobar"], "Controls Malacca Strait approaches"),
+    "Norfolk": (["norfolk", "naval station norfolk"], "Atlantic Fleet hub, largest naval base worldwide"),
+    "San Diego": (["san diego", "naval base san diego"], "Pacific Fleet hub with extensive repair facilities"),
+    "Pearl Harbor": (["pearl harbor", "pearl harbour", "honolulu"], "Central Pacific staging point, Pacific Fleet headquarters"),
+    "Yokosuka": (["yokosuka"], "Forward-deployed Seventh Fleet base near East Asia"),
+    "Guam": (["guam", "apra harbor", "apra harbour"], "Western Pacific forward base within Asian reach"),
+    "Rota": (["rota", "naval station rota"], "Gateway to Mediterranean and Atlantic"),
+    "Bahrain": (["bahrain", "manama", "nsa bahrain"], "Persian Gulf presence, Fifth Fleet headquarters"),
+    "Diego Garcia": (["diego garcia"], "Central Indian Ocean logistics and staging base"),
+    "Djibouti": (["djibouti"], "Controls Bab-el-Mandeb and Red Sea approaches"),
+    "Gibraltar": (["gibraltar"], "Controls Strait of Gibraltar chokepoint"),
+    "Souda Bay": (["souda bay", "crete"], "Eastern Mediterranean deep-water logistics hub"),
+    "Portsmouth": (["portsmouth", "hmnb portsmouth"], "English Channel access, Royal Navy surface fleet home"),
+    "Devonport": (["devonport", "plymouth", "hmnb devonport"], "Western Approaches access, major refit dockyard"),
+    "Faslane": (["faslane", "clyde", "hmnb clyde"], "North Atlantic access, submarine deterrent base"),
+    "Toulon": (["toulon"], "Mediterranean fleet hub, French carrier home port"),
+    "Brest": (["brest"], "Atlantic access, French strategic submarine base"),
+    "Sevastopol": (["sevastopol"], "Black Sea fleet headquarters, warm-water access"),
+    "Vladivostok": (["vladivostok"], "Pacific Fleet headquarters, Sea of Japan access"),
+    "Qingdao": (["qingdao"], "Yellow Sea access, Northern Theater fleet base"),
+    "Sanya": (["sanya", "yulin", "hainan"], "South China Sea access, submarine base"),
+    "Singapore": (["singapore", "changi", "changi naval base"], "Controls Malacca and Singapore Straits"),
+    "Sydney": (["sydney", "fleet base east", "garden island"], "Southwest Pacific access, Australian fleet hub"),
+    "Stirling": (["stirling", "hmas stirling", "fleet base west", "perth", "rockingham"], "Indian Ocean access, Australian submarine base"),
+    "Halifax": (["halifax", "cfb halifax"], "North Atlantic access, Canadian Atlantic fleet"),
+    "Esquimalt": (["esquimalt", "cfb esquimalt"], "Northeast Pacific access, Canadian Pacific fleet"),
+    "Karachi": (["karachi"], "Arabian Sea access near Strait of Hormuz"),
+    "Gwadar": (["gwadar"], "Overlooks Strait of Hormuz shipping lanes"),
+}
+
+# In-memory indexes
+def normalize(value) -> str:
+    text = re.sub(r"[^a-z0-9]+", " ", str(value or "").lower())
+    text = re.sub(r"\b(the|port|of|naval|navy|base|class|ship type|ship|vessel|mission|ins|uss|hms|hmas)\b", " ", text)
+    return " ".join(text.split())
+
+def _build_index(entries) -> dict:
+    index = {}
+    for canonical, aliases in entries:
+        for alias in [canonical] + aliases:
+            key = normalize(alias)
+            if key:
+                index.setdefault(key, canonical)
+    return index
+
+RANK_ORDER = {name: position for position, (name, _) in enumerate(RANKS)}
+RANK_INDEX = _build_index(RANKS)
+SHIP_TYPE_INDEX = _build_index((name, entry[0]) for name, entry in SHIP_TYPES.items())
+MISSION_TYPE_INDEX = _build_index((name, entry[0]) for name, entry in MISSION_TYPES.items())
+PORT_INDEX = _build_index((name, entry[0]) for name, entry in PORTS.items())
+
+def _lookup(index: dict, value) -> Optional[str]:
+    """Match the normalized value exactly, or as a run of aliases of one entry.
+
+    The value is segmented left to right into the longest aliases available, so
+    "guided missile destroyer ddg" resolves to Destroyer. Any word no alias
+    covers, or aliases of different entries, make the value ambiguous and
+    return None so the caller falls back to the LLM.
+    """
+    key = normalize(value)
+    if not key:
+        return None
+    if key in index:
+        return index[key]
+    tokens = key.split()
+    matched = set()
+    position = 0
+    while position < len(tokens):
+        for end in range(len(tokens), position, -1):
+            alias = " ".join(tokens[position:end])
+            if alias in index:
+                matched.add(index[alias])
+                position = end
+                break
+        else:
+            return None
+    return matched.pop() if len(matched) == 1 else None
+
+def lookup_rank(value) -> Optional[str]:
+    return _lookup(RANK_INDEX, value)
+
+def lookup_ship_type(value) -> Optional[str]:
+    return _lookup(SHIP_TYPE_INDEX, value)
+
+def lookup_mission_type(value) -> Optional[str]:
+    return _lookup(MISSION_TYPE_INDEX, value)
+
+def lookup_port(value) -> Optional[str]:
+    return _lookup(PORT_INDEX, value)
+
+# Deterministic Assessments
+# Each returns None when an input is outside the tables so the caller can fall back to the LLM.
+def assess_mission_priority(ship_type, mission_type) -> Optional[str]:
+    ship = lookup_ship_type(ship_type)
+    mission = lookup_mission_type(mission_type)
+    if not ship or not mission:
+        return None
+    ship_class = SHIP_TYPES[ship][1]
+    level = MISSION_TYPES[mission][1]
+    core_role = (ship_class, mission) in CORE_ROLES
+    if core_role:
+        level = min(level + 1, len(PRIORITY_LEVELS) - 1)
+    suffix = f", core {ship} role" if core_role else ""
+    return f"{PRIORITY_LEVELS[level]} - {mission}{suffix}"
+
+def assess_crew_readiness(crew_size, commander_rank, ship_type) -> Optional[str]:
+    ship = lookup_ship_type(ship_type)
+    rank = lookup_rank(commander_rank)
+    try:
+        crew_size = int(crew_size)
+    except (TypeError, ValueError):
+        return None
+    if not ship or not rank:
+        return None
+    _, _, min_crew, min_rank = SHIP_TYPES[ship]
+    shortfalls = []
+    if crew_size < min_crew:
+        shortfalls.append(f"crew below {min_crew} minimum")
+    if RANK_ORDER[rank] < RANK_ORDER[min_rank]:
+        shortfalls.append(f"{min_rank} or above required")
+    if shortfalls:
+        return f"Not ready: {'; '.join(shortfalls)}"
+    return "Ready: crew size and command rank meet requirements"
+
+def assess_strategic_advantage(home_port) -> Optional[str]:
+    port = lookup_port(home_port)
+    if not port:
+        return None
+    return PORTS[port][1]
@@ -0,0 +1,51 @@
+import re
+import json
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+# orjson and brotli are in requirements.txt; the standard library fallbacks keep
+# bare installs working
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+API_VERSION_HEADER = 'X-API-Version'
+COMPACT_API_VERSION = '2'
+COMPRESSION_THRESHOLD = getattr(settings, 'API_COMPRESSION_THRESHOLD', 1024)
+
+re_accepts_br = re.compile(r'\bbr\b')
+re_accepts_gzip = re.compile(r'\bgzip\b')
+
+def wants_compact_api(request) -> bool:
+    return request.headers.get(API_VERSION_HEADER) == COMPACT_API_VERSION
+
+def dumps_compact(payload) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, default=DjangoJSONEncoder().default)
+    return json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def compact_json_response(request, payload, status: int = 200) -> HttpResponse:
+    """Serialize ``payload`` once, compactly, compressing bodies above the threshold."""
+    body = dumps_compact(payload)
+    encoding = None
+    if len(body) >= COMPRESSION_THRESHOLD:
+        accept_encoding = request.headers.get('Accept-Encoding', '')
+        if brotli is not None and re_accepts_br.search(accept_encoding):
+            body, encoding = brotli.compress(body, quality=5), 'br'
+        elif re_accepts_gzip.search(accept_encoding):
+            body, encoding = compress_string(body), 'gzip'
+    response = HttpResponse(body, content_type='application/json', status=status)
+    response[API_VERSION_HEADER] = COMPACT_API_VERSION
+    if encoding:
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding', API_VERSION_HEADER))
+    return response
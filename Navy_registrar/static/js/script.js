@@ -7,8 +7,13 @@ $(document).ready(function() {
             type: 'POST',
             data: $(this).serialize(),
             success: function(response) {
-                // Extract the chatbot-response content from the response HTML
-                var responseText = $(response).find('#chatbot-response').text();
+                // Use the server-issued key for the next submission so a new
+                // message is not answered from the idempotency cache
+                if (response.idempotency_key) {
+                    $('#chatbot-form input[name="idempotency_key"]').val(response.idempotency_key);
+                }
+                var responseText = response.response;
+                $('#chatbot-response-panel').prop('hidden', false);
                 if (responseText) {
                     $('#chatbot-response').text(responseText);
                 } else {
@@ -16,6 +21,7 @@ $(document).ready(function() {
                 }
             },
             error: function(xhr, status, error) {
+                $('#chatbot-response-panel').prop('hidden', false);
                 $('#chatbot-response').text('Error processing request: ' + error);
             }
         });
@@ -0,0 +1,188 @@
+import re
+import json
+import logging
+from typing import Optional
+from .metrics import read
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+TURNS_KEY = "chatbot:analysis:turns"
+REPAIRS_KEY = "chatbot:analysis:repairs"
+RETRIES_KEY = "chatbot:analysis:retries"
+FAILURES_KEY = "chatbot:analysis:failures"
+
+# Typed schema for the analysis agent's output
+ANALYSIS_SCHEMA = {
+    "ship_name": str,
+    "ship_type": str,
+    "crew_size": int,
+    "commander_name": str,
+    "commander_rank": str,
+    "mission_type": str,
+    "home_port": str,
+    "question": list,
+    "commission_date": str,
+    "decommission_date": str,
+}
+
+_decoder = json.JSONDecoder()
+
+# Tolerant Parsing
+def find_json_object(text: str) -> Optional[dict]:
+    """Return the JSON object that starts at the first ``{`` of ``text``.
+
+    Trailing prose and stray braces after the object are ignored. A nested
+    object is never returned on its own, so a malformed outer object goes to
+    the repair pass instead of losing its fields.
+    """
+    start = text.find('{')
+    if start == -1:
+        return None
+    try:
+        value, _ = _decoder.raw_decode(text, start)
+    except json.JSONDecodeError:
+        return None
+    return value if isinstance(value, dict) else None
+
+def _close_brackets(text: str) -> str:
+    """Append closing brackets for any left open, e.g. by a truncated response."""
+    stack = []
+    in_string = escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '{[':
+            stack.append('}' if char == '{' else ']')
+        elif char in '}]' and stack and stack[-1] == char:
+            stack.pop()
+    if in_string:
+        text += '"'
+    return text + ''.join(reversed(stack))
+
+def _read_string(text: str, start: int) -> tuple:
+    """Read the string literal opening at ``start`` and return it as a JSON string with the index after it.
+
+    A single quote only closes its string when followed by ``:``, ``,``, ``}``,
+    ``]`` or the end of the text, so apostrophes inside the value survive. An
+    unterminated string is returned open for ``_close_brackets`` to finish.
+    """
+    quote = text[start]
+    chars = []
+    index = start + 1
+    while index < len(text):
+        char = text[index]
+        if char == '\\':
+            if index + 1 == len(text):
+                break
+            escaped = text[index + 1]
+            chars.append("'" if escaped == "'" else char + escaped)
+            index += 2
+            continue
+        if char == quote and (quote == '"' or text[index + 1:].lstrip()[:1] in ('', ':', ',', '}', ']')):
+            return '"' + ''.join(chars) + '"', index + 1
+        chars.append('\\"' if char == '"' else char)
+        index += 1
+    return '"' + ''.join(chars), len(text)
+
+def _repair_outside_strings(text: str) -> str:
+    """Apply the unquoted key, Python literal and trailing comma fixes between string literals only."""
+    def repair(segment: str) -> str:
+        # Unquoted keys
+        segment = re.sub(r'([{,]\s*)([A-Za-z_][A-Za-z0-9_]*)(\s*:)', r'\1"\2"\3', segment)
+        # Python literals
+        segment = re.sub(r'\bNone\b', 'null', segment)
+        segment = re.sub(r'\bTrue\b', 'true', segment)
+        segment = re.sub(r'\bFalse\b', 'false', segment)
+        # Trailing commas
+        return re.sub(r',(\s*[}\]])', r'\1', segment)
+
+    pieces = []
+    outside_start = index = 0
+    previous = ''
+    while index < len(text):
+        char = text[index]
+        # Single-quoted strings only open where a key or value can start
+        if char == '"' or (char == "'" and previous in ('{', '[', ',', ':')):
+            pieces.append(repair(text[outside_start:index]))
+            literal, index = _read_string(text, index)
+            pieces.append(literal)
+            outside_start = index
+            previous = '"'
+            continue
+        if not char.isspace():
+            previous = char
+        index += 1
+    pieces.append(repair(text[outside_start:]))
+    return ''.join(pieces)
+
+def repair_json(text: str) -> Optional[dict]:
+    """Single local repair pass for the common ways LLM output misses valid JSON.
+
+    Fixes are applied outside string literals only, so values such as
+    ``"HMS None Such"`` or ``"crew, ready: yes"`` come through unchanged.
+    """
+    text = re.sub(r"```(?:json)?", "", text)
+    start = text.find('{')
+    if start == -1:
+        return None
+    candidate = text[start:]
+    candidate = candidate.translate(str.maketrans({'“': '"', '”': '"', '‘': "'", '’': "'"}))
+    candidate = _repair_outside_strings(candidate)
+    return find_json_object(candidate) or find_json_object(_close_brackets(candidate.rstrip().rstrip(',')))
+
+def coerce_analysis_fields(data: dict) -> dict:
+    """Coerce known analysis fields to their schema types, leaving unknown keys untouched."""
+    for field, field_type in ANALYSIS_SCHEMA.items():
+        value = data.get(field)
+        if value is None:
+            if field_type is list and field in data:
+                data[field] = []
+            continue
+        if isinstance(value, field_type):
+            continue
+        if field_type is int:
+            match = re.search(r'\d[\d,]*', str(value))
+            data[field] = int(match.group().replace(',', '')) if match else None
+        elif field_type is list:
+            data[field] = [value] if isinstance(value, str) and value else list(value) if isinstance(value, (tuple, set)) else []
+        else:
+            data[field] = str(value)
+    return data
+
+def failed_generation(error: Exception) -> Optional[str]:
+    """Return the rejected output when ``error`` is a JSON mode validation failure.
+
+    Groq answers output that is not valid JSON with a 400 ``json_validate_failed``
+    error carrying the generation. Returns ``None`` for any other error.
+    """
+    if 'json_validate_failed' not in str(error):
+        return None
+    body = getattr(error, 'body', None)
+    if isinstance(body, dict):
+        details = body.get('error', body)
+        if isinstance(details, dict):
+            return details.get('failed_generation') or ""
+    return ""
+
+# Parse Metrics
+def parse_stats() -> dict:
+    turns = read(TURNS_KEY)
+    repairs = read(REPAIRS_KEY)
+    retries = read(RETRIES_KEY)
+    failures = read(FAILURES_KEY)
+    return {
+        "turns": turns,
+        "repairs": repairs,
+        "retries": retries,
+        "failures": failures,
+        "failure_rate": failures / turns if turns else 0.0,
+        "retries_per_turn": retries / turns if turns else 0.0,
+    }
@@ -1,3 +1,497 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import time
+from contextlib import ExitStack
+from datetime import timedelta
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+import brotli
+from . import concurrency, question_cache, responses
+from .exports import ship_rows, conversation_rows, export_stream
+from .models import Conversation, QuestionAnswer, ShipInformation, CrewInformation, MissionInformation, PortInformation
+from .concurrency import idempotency_cache_key, user_turn_lock, renewed_lease, check_rate_limit, concurrency_slot
+from .question_cache import QuestionIndex, tokenize, lookup_answer, store_answer, evict, cache_stats
+from .reference_data import (
+    lookup_rank, lookup_ship_type, lookup_mission_type, lookup_port,
+    assess_mission_priority, assess_crew_readiness, assess_strategic_advantage
+)
+from .structured_output import find_json_object, repair_json, coerce_analysis_fields, failed_generation
+from .utils import (
+    get_conversation_context, add_conversation,
+    insert_crew_info_and_assess_readiness, insert_port_info_and_determine_strategic_advantage
+)
 
-# Create your tests here.
+# Stands in for the Redis cache that REDIS_URL enables
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+# The manifest only exists after collectstatic
+PLAIN_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+@override_settings(STORAGES=PLAIN_STORAGES)
+class ConfiguredCacheQueryCountTests(TestCase):
+    def test_chatbot_page_query_count(self):
+        user = User.objects.create_user(username='captain', password='s3cure-pass-123')
+        self.client.force_login(user)
+        self.client.get(reverse('Navy_registrar:chatbot'))
+        # Redis serves the session and user; otherwise each is one database query
+        expected_queries = 0 if settings.REDIS_URL else 2
+        with self.assertNumQueries(expected_queries):
+            response = self.client.get(reverse('Navy_registrar:chatbot'))
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    STORAGES=PLAIN_STORAGES,
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+    AUTHENTICATION_BACKENDS=['Navy_registrar.backends.CachedModelBackend'],
+)
+class RequestQueryCountTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='captain', password='s3cure-pass-123')
+
+    def test_chatbot_page_served_without_session_or_user_queries(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('Navy_registrar:chatbot'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('Navy_registrar:chatbot'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_user_cache_invalidated_on_save(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('Navy_registrar:chatbot'))
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(reverse('Navy_registrar:chatbot'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_conversation_helpers_do_not_query_auth_user(self):
+        with self.assertNumQueries(1):
+            add_conversation(self.user.pk, {'ship_name': 'INS Arihant'})
+        with self.assertNumQueries(1):
+            context = get_conversation_context(self.user.pk)
+        self.assertEqual(context, {'ship_name': 'INS Arihant'})
+        self.assertEqual(Conversation.objects.filter(user=self.user).count(), 1)
+
+
+class ReferenceDataTests(SimpleTestCase):
+    def test_lookups_resolve_exact_and_alias_runs(self):
+        cases = [
+            (lookup_ship_type, "Ballistic Missile Submarine Ship", "Ballistic Missile Submarine"),
+            (lookup_ship_type, "Guided Missile Destroyer (DDG)", "Destroyer"),
+            (lookup_ship_type, "SSBN", "Ballistic Missile Submarine"),
+            (lookup_rank, "Lt. Cdr.", "Lieutenant Commander"),
+            (lookup_rank, "Captain", "Captain"),
+            (lookup_mission_type, "deterrence mission", "Strategic Deterrence"),
+            (lookup_port, "Visakhapatnam", "Visakhapatnam"),
+            (lookup_port, "Naval Station Norfolk", "Norfolk"),
+        ]
+        for lookup, value, expected in cases:
+            with self.subTest(value=value):
+                self.assertEqual(lookup(value), expected)
+
+    def test_partial_or_ambiguous_inputs_fall_back_to_llm(self):
+        cases = [
+            (lookup_mission_type, "War games"),
+            (lookup_mission_type, "Combat training"),
+            (lookup_mission_type, "Anti-submarine patrol"),
+            (lookup_port, "Portsmouth, Virginia"),
+            (lookup_port, "Perth, Scotland"),
+            (lookup_ship_type, "Starship"),
+            (lookup_rank, ""),
+        ]
+        for lookup, value in cases:
+            with self.subTest(value=value):
+                self.assertIsNone(lookup(value))
+
+    def test_assessments(self):
+        self.assertEqual(
+            assess_mission_priority("Ballistic Missile Submarine", "deterrence"),
+            "Critical - Strategic Deterrence, core Ballistic Missile Submarine role"
+        )
+        self.assertEqual(
+            assess_crew_readiness(100, "Captain", "Ballistic Missile Submarine"),
+            "Ready: crew size and command rank meet requirements"
+        )
+        self.assertEqual(
+            assess_crew_readiness("80", "Lt Cdr", "Destroyer"),
+            "Not ready: crew below 200 minimum; Commander or above required"
+        )
+        self.assertIsNone(assess_crew_readiness("many", "Captain", "Destroyer"))
+        self.assertIsNone(assess_mission_priority("Destroyer", "War games"))
+        self.assertIsNone(assess_strategic_advantage("Atlantis"))
+
+
+class StructuredOutputTests(SimpleTestCase):
+    def test_find_json_object_ignores_surrounding_prose(self):
+        self.assertEqual(find_json_object('Sure: {"a": {"b": 1}} hope that helps }'), {"a": {"b": 1}})
+        self.assertIsNone(find_json_object("no json here"))
+
+    def test_malformed_outer_object_is_repaired_not_replaced_by_nested(self):
+        text = '{"ship_name": "INS X", "ship_type": \'Destroyer\', "extra": {"note": "hi"}}'
+        self.assertIsNone(find_json_object(text))
+        self.assertEqual(
+            repair_json(text),
+            {"ship_name": "INS X", "ship_type": "Destroyer", "extra": {"note": "hi"}}
+        )
+
+    def test_repair_trailing_commas_and_code_fences(self):
+        text = '```json\n{"ship_name": "X", "question": ["a",],}\n```'
+        self.assertEqual(repair_json(text), {"ship_name": "X", "question": ["a"]})
+
+    def test_repair_truncated_output(self):
+        self.assertEqual(
+            repair_json('{"ship_name": "INS X", "question": ["what is'),
+            {"ship_name": "INS X", "question": ["what is"]}
+        )
+
+    def test_repair_python_literals_and_unquoted_keys(self):
+        self.assertEqual(repair_json("{ship_name: 'X', home_port: None}"), {"ship_name": "X", "home_port": None})
+
+    def test_repair_leaves_string_values_untouched(self):
+        self.assertEqual(
+            repair_json('{"ship_name": "HMS None Such", "commander_name": "True Blue", "ship_type": \'Frigate\'}'),
+            {"ship_name": "HMS None Such", "commander_name": "True Blue", "ship_type": "Frigate"}
+        )
+        self.assertEqual(
+            repair_json('{"status": "crew, ready: yes", home_port: \'Norfolk\', active: False,}'),
+            {"status": "crew, ready: yes", "home_port": "Norfolk", "active": False}
+        )
+        self.assertEqual(
+            repair_json("{ship_name: 'Captain's Pride', note: 'say \"True\"'}"),
+            {"ship_name": "Captain's Pride", "note": 'say "True"'}
+        )
+
+    def test_coerce_analysis_fields(self):
+        data = coerce_analysis_fields({"question": None, "crew_size": "1,200 sailors", "ship_name": 5})
+        self.assertEqual(data, {"question": [], "crew_size": 1200, "ship_name": "5"})
+        self.assertEqual(coerce_analysis_fields({"question": "Why?"}), {"question": ["Why?"]})
+
+    def test_failed_generation(self):
+        class JsonValidateFailed(Exception):
+            body = {"error": {"code": "json_validate_failed", "failed_generation": "{bad"}}
+
+        self.assertEqual(failed_generation(JsonValidateFailed("Error code: 400 - json_validate_failed")), "{bad")
+        self.assertIsNone(failed_generation(RuntimeError("connection reset")))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class QuestionCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(question_cache, 'question_index', QuestionIndex())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_tokenize_drops_stopwords_and_plurals(self):
+        self.assertEqual(tokenize("What's the crew size of the frigates?"), ["crew", "size", "frigate"])
+        self.assertEqual(tokenize("Which class"), ["class"])
+
+    def test_rephrased_question_hits_above_threshold(self):
+        store_answer("How many crew does a frigate need?", "About 200.")
+        self.assertEqual(lookup_answer("how many crew do frigates need"), "About 200.")
+        self.assertEqual(QuestionAnswer.objects.get().hit_count, 1)
+
+    def test_word_order_and_negation_miss(self):
+        store_answer("Is a frigate faster than a destroyer?", "No.")
+        store_answer("How many crew does a frigate need?", "About 200.")
+        self.assertIsNone(lookup_answer("Is a destroyer faster than a frigate?"))
+        self.assertIsNone(lookup_answer("How many crew does a frigate not need?"))
+
+    def test_evict_drops_least_recently_used(self):
+        with mock.patch.object(question_cache, 'MAX_ENTRIES', 2):
+            store_answer("What is the home port of INS Vikrant?", "Karwar.")
+            store_answer("Who commands INS Kolkata?", "A captain.")
+            self.assertEqual(lookup_answer("home port of INS Vikrant"), "Karwar.")
+            store_answer("What is the displacement of INS Arihant?", "About 6,000 tonnes.")
+            evict()
+        self.assertEqual(
+            set(QuestionAnswer.objects.values_list('question', flat=True)),
+            {"What is the home port of INS Vikrant?", "What is the displacement of INS Arihant?"}
+        )
+        self.assertIsNone(lookup_answer("Who commands INS Kolkata?"))
+
+    def test_rows_from_other_processes_are_synced_and_removed(self):
+        entry = QuestionAnswer.objects.create(question="What is the range of a Kolkata class destroyer?", answer="8,000 nmi.")
+        self.assertEqual(lookup_answer("range of a Kolkata class destroyer"), "8,000 nmi.")
+        entry.delete()
+        self.assertIsNone(lookup_answer("range of a Kolkata class destroyer"))
+        self.assertNotIn(entry.pk, question_cache.question_index.terms)
+
+    def test_cache_stats(self):
+        self.assertEqual(cache_stats(), {"hits": 0, "misses": 0, "hit_rate": 0.0})
+        store_answer("Who commands INS Kolkata?", "A captain.")
+        lookup_answer("Who commands INS Kolkata?")
+        lookup_answer("What is the range of a Kolkata class destroyer?")
+        self.assertEqual(cache_stats(), {"hits": 1, "misses": 1, "hit_rate": 0.5})
+
+
+@override_settings(CACHES=LOCMEM_CACHES, STORAGES=PLAIN_STORAGES)
+class ChatbotIdempotencyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='captain', password='s3cure-pass-123')
+        self.client.force_login(self.user)
+        patcher = mock.patch('Navy_registrar.views.run_chatbot_turn', return_value={"data": {"ship_name": "INS X"}})
+        self.run_turn = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, user_input="Register INS X", key="key-1"):
+        return self.client.post(
+            reverse('Navy_registrar:chatbot'),
+            {'user_input': user_input, 'idempotency_key': key},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+
+    def test_completed_key_is_replayed(self):
+        first = self.post()
+        second = self.post()
+        self.assertEqual(self.run_turn.call_count, 1)
+        self.assertEqual(first.json()['response'], second.json()['response'])
+        self.assertNotEqual(first.json()['idempotency_key'], second.json()['idempotency_key'])
+
+    def test_in_flight_marked_before_admission(self):
+        cache_key = idempotency_cache_key(self.user.pk, "key-1", "Register INS X")
+        seen = []
+        with mock.patch('Navy_registrar.views.check_rate_limit', side_effect=lambda user: seen.append(cache.get(f"{cache_key}:in-flight"))):
+            self.post()
+        self.assertEqual(seen, [True])
+        self.assertIsNone(cache.get(f"{cache_key}:in-flight"))
+
+    def test_duplicate_waits_for_in_flight_run(self):
+        cache_key = idempotency_cache_key(self.user.pk, "key-1", "Register INS X")
+        result = {"data": {"ship_name": "INS Y"}}
+        with user_turn_lock(self.user.pk):
+            concurrency.mark_in_flight(cache_key)
+            # The running turn finishes while the duplicate polls
+            with mock.patch.object(concurrency.time, 'sleep', side_effect=lambda _: cache.set(cache_key, result)):
+                response = self.post()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("INS Y", response.json()['response'])
+        self.run_turn.assert_not_called()
+
+    def test_other_submission_rejected_while_turn_runs(self):
+        with user_turn_lock(self.user.pk):
+            response = self.post(key="key-2")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], str(concurrency.TURN_BUSY_RETRY_AFTER))
+        self.run_turn.assert_not_called()
+        self.assertEqual(self.post(key="key-2").status_code, 200)
+
+    def test_lease_renewed_while_held(self):
+        cache.add("lease", "token", 1)
+        with renewed_lease("lease", "token", 1):
+            time.sleep(1.5)
+            self.assertEqual(cache.get("lease"), "token")
+
+
+@override_settings(CACHES=LOCMEM_CACHES, STORAGES=PLAIN_STORAGES)
+class AdmissionControlTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='captain', password='s3cure-pass-123')
+        self.staff = User.objects.create_user(username='admiral', password='s3cure-pass-123', is_staff=True)
+
+    def test_token_bucket_limits_and_refills(self):
+        with mock.patch.dict(concurrency.RATE_LIMITS, {'default': (2, 1 / 60)}), \
+                mock.patch.object(concurrency.time, 'time', return_value=1000.0) as clock:
+            self.assertIsNone(check_rate_limit(self.user))
+            self.assertIsNone(check_rate_limit(self.user))
+            self.assertAlmostEqual(check_rate_limit(self.user), 60.0)
+            clock.return_value = 1030.0
+            self.assertAlmostEqual(check_rate_limit(self.user), 30.0)
+            clock.return_value = 1060.0
+            self.assertIsNone(check_rate_limit(self.user))
+
+    def test_staff_reserved_slots(self):
+        with mock.patch.object(concurrency, 'MAX_CONCURRENT_TURNS', 3), \
+                mock.patch.object(concurrency, 'STAFF_RESERVED_TURNS', 1), ExitStack() as held:
+            self.assertTrue(held.enter_context(concurrency_slot(self.user)))
+            self.assertTrue(held.enter_context(concurrency_slot(self.user)))
+            self.assertFalse(held.enter_context(concurrency_slot(self.user)))
+            self.assertTrue(held.enter_context(concurrency_slot(self.staff)))
+            self.assertFalse(held.enter_context(concurrency_slot(self.staff)))
+        with concurrency_slot(self.user) as admitted:
+            self.assertTrue(admitted)
+
+    def post(self, key):
+        return self.client.post(
+            reverse('Navy_registrar:chatbot'),
+            {'user_input': "Register INS X", 'idempotency_key': key},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+
+    @mock.patch('Navy_registrar.views.run_chatbot_turn', return_value={"data": {}})
+    def test_rate_limited_turn_gets_429_with_retry_after(self, run_turn):
+        self.client.force_login(self.user)
+        with mock.patch.dict(concurrency.RATE_LIMITS, {'default': (1, 1 / 60)}):
+            self.assertEqual(self.post("key-1").status_code, 200)
+            response = self.post("key-2")
+        self.assertEqual(response.status_code, 429)
+        self.assertIn(response['Retry-After'], ('59', '60'))
+        self.assertEqual(run_turn.call_count, 1)
+
+    @mock.patch('Navy_registrar.views.run_chatbot_turn', return_value={"data": {}})
+    def test_saturated_turn_gets_429_without_taking_a_token(self, run_turn):
+        self.client.force_login(self.user)
+        with mock.patch.object(concurrency, 'MAX_CONCURRENT_TURNS', 2), \
+                mock.patch.object(concurrency, 'STAFF_RESERVED_TURNS', 2):
+            response = self.post("key-1")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], str(concurrency.SATURATED_RETRY_AFTER))
+        self.assertIsNone(cache.get(f"chatbot:bucket:{self.user.pk}"))
+        run_turn.assert_not_called()
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.ships = []
+        for number in range(5):
+            ship = ShipInformation.objects.create(ship_name=f"INS Ship {number}", ship_type="Destroyer")
+            CrewInformation.objects.create(ship=ship, crew_size=200 + number, commander_name=f"Cdr {number}", commander_rank="Captain")
+            MissionInformation.objects.create(ship=ship, mission_type="Patrol")
+            PortInformation.objects.create(ship=ship, home_port=f"Port {number}")
+            self.ships.append(ship)
+        self.ships.sort(key=lambda ship: ship.pk)
+
+    def export(self, dataset='ships', **kwargs):
+        return b''.join(export_stream(dataset, **kwargs))
+
+    def test_keyset_pages_keep_related_rows_with_their_ship(self):
+        # Three pages of ship, crew, mission and port queries, plus the empty final page
+        with self.assertNumQueries(13):
+            rows = list(ship_rows(chunk_size=2))
+        self.assertEqual([row['ship_id'] for row in rows], [str(ship.pk) for ship in self.ships])
+        for row in rows:
+            number = row['ship_name'].rsplit(' ', 1)[1]
+            self.assertEqual(row['crew'], [{'crew_size': 200 + int(number), 'commander_name': f"Cdr {number}", 'commander_rank': "Captain"}])
+            self.assertEqual(row['missions'], ["Patrol"])
+            self.assertEqual(row['ports'], [f"Port {number}"])
+
+    def test_jsonl_and_csv_output(self):
+        lines = self.export(fmt='jsonl', chunk_size=2).decode().splitlines()
+        self.assertEqual([json.loads(line)['ship_id'] for line in lines], [str(ship.pk) for ship in self.ships])
+        records = list(csv.reader(io.StringIO(self.export(fmt='csv', chunk_size=2).decode())))
+        self.assertEqual(records[0], ['ship_id', 'ship_name', 'ship_type', 'updated_at', 'crew', 'missions', 'ports'])
+        self.assertEqual(len(records), 6)
+        self.assertEqual(json.loads(records[1][6]), [json.loads(lines[0])['ports'][0]])
+
+    def test_gzip_output_decompresses(self):
+        self.assertEqual(gzip.decompress(self.export(compress=True)), self.export())
+
+    def test_conversation_rows(self):
+        user = User.objects.create_user(username='captain', password='s3cure-pass-123')
+        add_conversation(user.pk, {'ship_name': 'INS Arihant'})
+        self.assertEqual(
+            [(row['username'], row['data']) for row in conversation_rows()],
+            [('captain', {'ship_name': 'INS Arihant'})]
+        )
+
+    def test_since_includes_ships_with_new_crew_or_port_rows(self):
+        ShipInformation.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        since = timezone.now() - timedelta(hours=1)
+        self.assertEqual(list(ship_rows(since=since)), [])
+        crew_ship, port_ship = self.ships[1], self.ships[3]
+        insert_crew_info_and_assess_readiness({'data': {
+            'ship_id': str(crew_ship.pk), 'ship_name': crew_ship.ship_name, 'ship_type': "Ballistic Missile Submarine",
+            'crew_size': 100, 'commander_name': "Cdr X", 'commander_rank': "Captain",
+        }})
+        insert_port_info_and_determine_strategic_advantage({'data': {'ship_id': str(port_ship.pk), 'home_port': "Visakhapatnam"}})
+        self.assertEqual(
+            {row['ship_id'] for row in ship_rows(since=since)},
+            {str(crew_ship.pk), str(port_ship.pk)}
+        )
+
+    @override_settings(STORAGES=PLAIN_STORAGES)
+    def test_export_view_is_staff_only(self):
+        url = reverse('Navy_registrar:export', args=['ships'])
+        self.client.force_login(User.objects.create_user(username='captain', password='s3cure-pass-123'))
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(User.objects.create_user(username='admiral', password='s3cure-pass-123', is_staff=True))
+        response = self.client.get(url, {'format': 'csv', 'gzip': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), self.export(fmt='csv'))
+
+    @override_settings(STORAGES=PLAIN_STORAGES)
+    def test_invalid_since_rejected(self):
+        self.client.force_login(User.objects.create_user(username='admiral', password='s3cure-pass-123', is_staff=True))
+        url = reverse('Navy_registrar:export', args=['ships'])
+        for since in ('yesterday', '2024-13-45T00:00:00'):
+            with self.subTest(since=since):
+                self.assertEqual(self.client.get(url, {'since': since}).status_code, 400)
+                with self.assertRaises(CommandError):
+                    call_command('export_data', 'ships', since=since)
+
+    def test_export_command_writes_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'ships.jsonl.gz')
+            call_command('export_data', 'ships', gzip=True, chunk_size=2, output=path)
+            with open(path, 'rb') as output:
+                self.assertEqual(gzip.decompress(output.read()), self.export())
+
+
+@override_settings(CACHES=LOCMEM_CACHES, STORAGES=PLAIN_STORAGES)
+class CompactApiTests(TestCase):
+    small_payload = {"data": {"ship_name": "INS Arihant", "crew_size": 100}}
+    large_payload = {"data": {"ship_name": "INS Arihant"}, "questions_answers": [
+        {"question": f"Question {number}?", "answer": "A long answer about naval operations. " * 3}
+        for number in range(20)
+    ]}
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user(username='captain', password='s3cure-pass-123'))
+
+    def post(self, payload, **headers):
+        with mock.patch('Navy_registrar.views.run_chatbot_turn', return_value=payload), \
+                mock.patch.object(responses, 'dumps_compact', wraps=responses.dumps_compact) as dumps:
+            response = self.client.post(
+                reverse('Navy_registrar:chatbot'), {'user_input': "Register INS Arihant"},
+                HTTP_X_REQUESTED_WITH='XMLHttpRequest', HTTP_X_API_VERSION='2', **headers
+            )
+        self.assertEqual(dumps.call_count, 1)
+        return response
+
+    def test_body_is_compact_object(self):
+        response = self.post(self.small_payload, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response.content, b'{"data":{"ship_name":"INS Arihant","crew_size":100}}')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(response['X-API-Version'], '2')
+        self.assertIn('X-Next-Idempotency-Key', response)
+
+    def test_stdlib_fallback_matches_orjson(self):
+        with mock.patch.object(responses, 'orjson', None):
+            fallback = responses.dumps_compact(self.large_payload)
+        self.assertEqual(fallback, responses.dumps_compact(self.large_payload))
+
+    def test_compression_above_threshold_follows_accept_encoding(self):
+        body = responses.dumps_compact(self.large_payload)
+        self.assertGreaterEqual(len(body), responses.COMPRESSION_THRESHOLD)
+        cases = [
+            ('gzip, deflate, br', 'br', brotli.decompress),
+            ('gzip', 'gzip', gzip.decompress),
+            ('', None, lambda content: content),
+        ]
+        for accept_encoding, encoding, decompress in cases:
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self.post(self.large_payload, HTTP_ACCEPT_ENCODING=accept_encoding)
+                self.assertEqual(response.get('Content-Encoding'), encoding)
+                self.assertEqual(decompress(response.content), body)
+                vary = [header.strip() for header in response['Vary'].split(',')]
+                self.assertIn('Accept-Encoding', vary)
+                self.assertIn('X-API-Version', vary)
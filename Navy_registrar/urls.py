@@ -8,4 +8,5 @@ urlpatterns = [
     path('', views.user_login, name='login'),
     path('logout/', views.user_logout, name='logout'),
     path('chatbot/', views.chatbot, name='chatbot'),
+    path('export/<str:dataset>/', views.export, name='export'),
 ]
\ No newline at end of file
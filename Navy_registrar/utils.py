@@ -2,14 +2,21 @@ import os
 import json
 import uuid
 from datetime import datetime
-from typing import TypedDict, Sequence, Dict, Optional
+from typing import TypedDict, Optional
 from langchain_groq import ChatGroq
-from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from langgraph.graph import StateGraph, START, END
 from langgraph.checkpoint.memory import MemorySaver
-from django.contrib.auth.models import User
 from django.db import transaction
+from django.utils import timezone
 from .models import ShipInformation, CrewInformation, MissionInformation, PortInformation, Conversation
+from .reference_data import assess_mission_priority, assess_crew_readiness, assess_strategic_advantage
+from .question_cache import lookup_answer, store_answer
+from .metrics import increment
+from .structured_output import (
+    find_json_object, repair_json, coerce_analysis_fields, failed_generation,
+    TURNS_KEY, REPAIRS_KEY, RETRIES_KEY, FAILURES_KEY
+)
 import logging
 
 # Set up logger
@@ -21,23 +28,15 @@ groq_llm = ChatGroq(
     model_name="llama-3.3-70b-versatile",
     temperature=0
 )
+# Provider JSON mode for the analysis agent: responses are constrained to a JSON object
+analysis_llm = groq_llm.bind(response_format={"type": "json_object"})
 
 # State Definitions
-class AgentState(TypedDict):
-    query: str
-    data: dict
-    memory: dict
-    error: str
-    messages: Sequence[BaseMessage]
-    user_id: str
-
 class SuperAgentState(TypedDict):
     query: str
     data: dict
-    memory: dict
-    uid: str
+    uid: int
     error: str
-    output: Optional[dict]
     questions: list
     answers: list
     ISIC: str
@@ -46,22 +45,16 @@ class SuperAgentState(TypedDict):
     next: Optional[str]
 
 # Conversation Management
-def get_conversation_context(user_id: str) -> dict:
-    try:
-        user = User.objects.get(username=user_id)
-        latest_conversation = Conversation.objects.filter(user=user).order_by('-timestamp').first()
-        return latest_conversation.data if latest_conversation else {}
-    except User.DoesNotExist:
-        return {}
+def get_conversation_context(user_pk: int) -> dict:
+    latest_conversation = Conversation.objects.filter(user_id=user_pk).order_by('-timestamp').values_list('data', flat=True).first()
+    return latest_conversation or {}
 
-def add_conversation(user_id: str, data: dict):
-    try:
-        user = User.objects.get(username=user_id)
-        Conversation.objects.create(user=user, data=data)
-    except User.DoesNotExist:
-        pass
+def add_conversation(user_pk: int, data: dict):
+    Conversation.objects.create(user_id=user_pk, data=data)
 
 # Analysis Prompt
+retry_prompt = "Your previous reply was not a valid JSON object. Reply again with only the JSON dictionary described above."
+
 analysis_prompt = """You are an analysis agent specialized in parsing naval and military queries. Your primary function is to:
 
 1. Extract structured information from natural language queries
@@ -98,26 +91,38 @@ Rules:
 # Utility Functions
 def extract_dict_from_string(text: str) -> Optional[dict]:
     logger.debug(f"Raw LLM response: {text}")
-    start_index = text.find('{')
-    end_index = text.rfind('}')
-    if start_index == -1 or end_index == -1 or start_index >= end_index:
-        logger.error("No valid JSON object found in response")
-        return None
-    json_string = text[start_index:end_index+1]
-    try:
-        json_data = json.loads(json_string)
-        logger.debug(f"Parsed JSON: {json_data}")
-        return json_data
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON decoding error: {e}")
-        return None
+    json_data = find_json_object(text)
+    if json_data is None:
+        json_data = repair_json(text)
+        if json_data is None:
+            logger.error("No valid JSON object found in response")
+            return None
+        increment(REPAIRS_KEY)
+        logger.warning("Recovered JSON from LLM response with local repair")
+    logger.debug(f"Parsed JSON: {json_data}")
+    return json_data
 
 def format_context(context: dict) -> str:
     return json.dumps(context, indent=2) if context else "{}"
 
+def invoke_analysis_llm(messages) -> str:
+    """Invoke the analysis LLM and return its text, including JSON mode rejections.
+
+    A JSON mode validation error is a parse failure, not an invocation failure:
+    the rejected generation is returned so it goes through repair and the retry.
+    """
+    try:
+        return analysis_llm.invoke(messages).content
+    except Exception as e:
+        generation = failed_generation(e)
+        if generation is None:
+            raise
+        logger.warning(f"JSON mode rejected LLM output: {e}")
+        return generation
+
 # Analysis Node
-def analysis_node(state: AgentState) -> AgentState:
-    user_id = state["user_id"]
+def analysis_node(state: SuperAgentState) -> SuperAgentState:
+    user_id = state["uid"]
     context = get_conversation_context(user_id)
     context_str = format_context(context)
     try:
@@ -125,23 +130,35 @@ def analysis_node(state: AgentState) -> AgentState:
         logger.debug(f"Formatted prompt for user {user_id}: {prompt_content[:500]}...")
     except Exception as e:
         logger.error(f"Error formatting prompt for user {user_id}: {e}", exc_info=True)
-        return {**state, "error": f"Prompt formatting failed: {e}", "data": {}}
+        return {**state, "error": f"Prompt formatting failed: {e}", "data": {}, "next": "END"}
 
     messages = [
         SystemMessage(content=prompt_content),
         HumanMessage(content=state["query"])
     ]
+    increment(TURNS_KEY)
     try:
-        response = groq_llm.invoke(messages)
-        logger.debug(f"LLM response for user {user_id}: {response.content}")
+        content = invoke_analysis_llm(messages)
+        logger.debug(f"LLM response for user {user_id}: {content}")
     except Exception as e:
         logger.error(f"Error during LLM invocation: {e}", exc_info=True)
-        return {**state, "error": f"LLM invocation failed: {e}", "data": {}}
-
-    parsed_data = extract_dict_from_string(response.content)
+        return {**state, "error": f"LLM invocation failed: {e}", "data": {}, "next": "END"}
+
+    parsed_data = extract_dict_from_string(content)
+    if parsed_data is None:
+        # One re-ask only after local parsing and repair have failed
+        increment(RETRIES_KEY)
+        logger.warning(f"Re-asking LLM for valid JSON for user {user_id}")
+        messages = messages + [AIMessage(content=content or "(invalid JSON)"), HumanMessage(content=retry_prompt)]
+        try:
+            parsed_data = extract_dict_from_string(invoke_analysis_llm(messages))
+        except Exception as e:
+            logger.error(f"Error during LLM retry: {e}", exc_info=True)
     if not parsed_data:
+        increment(FAILURES_KEY)
         logger.error("Failed to parse structured data from LLM response")
-        return {**state, "error": "Failed to parse response", "data": {}}
+        return {**state, "error": "Failed to parse response", "data": {}, "next": "END"}
+    parsed_data = coerce_analysis_fields(parsed_data)
 
     parsed_data["commander_name"] = None if str(parsed_data.get("commander_name", "")) == str(parsed_data.get("commander_rank", "")) else str(parsed_data.get("commander_name", ""))
     parsed_data["ship_name"] = None if str(parsed_data.get("ship_name", "")) == str(parsed_data.get("ship_type", "")) else str(parsed_data.get("ship_name", ""))
@@ -159,7 +176,8 @@ def analysis_node(state: AgentState) -> AgentState:
         return {
             **state,
             "error": "Please provide either mission_type or home_port",
-            "data": parsed_data
+            "data": parsed_data,
+            "next": "END"
         }
 
     missing_params = [param for param in mandatory_params if not parsed_data.get(param)]
@@ -168,43 +186,14 @@ def analysis_node(state: AgentState) -> AgentState:
         return {
             **state,
             "error": f"Please provide: {', '.join(missing_params)}",
-            "data": parsed_data
+            "data": parsed_data,
+            "next": "END"
         }
 
     logger.info(f"Successfully parsed data for user {user_id}: {parsed_data}")
-    return {**state, "data": parsed_data, "error": None}
-
-# Analysis Workflow
-analysis_workflow = StateGraph(AgentState)
-analysis_workflow.add_node("analysis", analysis_node)
-analysis_workflow.set_entry_point("analysis")
-analysis_workflow.add_edge("analysis", END)
-analysis_graph = analysis_workflow.compile()
+    return {**state, "data": parsed_data, "error": None, "next": "router"}
 
 # Supergraph Nodes
-def payload_maker(state: SuperAgentState) -> SuperAgentState:
-    user_input = state["query"]
-    user_id = state["uid"]
-    logger.debug(f"Payload maker processing input for {user_id}: {user_input}")
-    initial_agent_state = {
-        "query": user_input,
-        "data": {},
-        "memory": {},
-        "error": None,
-        "messages": [HumanMessage(content=user_input)],
-        "user_id": user_id
-    }
-    final_agent_state = analysis_graph.invoke(initial_agent_state)
-    logger.debug(f"Payload maker state update: {final_agent_state}")
-    if final_agent_state["error"]:
-        logger.error(f"Error during analysis: {final_agent_state['error']}")
-        state["error"] = final_agent_state["error"]
-        state["next"] = "END"
-    else:
-        state["data"] = final_agent_state["data"]
-        state["next"] = "router"
-    return state
-
 def router_node(state: SuperAgentState) -> SuperAgentState:
     data = state['data']
     if 'ship_id' not in data:
@@ -235,6 +224,12 @@ def insert_ship_info_and_calculate_priority(state: SuperAgentState) -> SuperAgen
         state['next'] = "END"
         return state
 
+    priority = assess_mission_priority(data['ship_type'], data['mission_type'])
+    if priority:
+        state['ISIC'] = f"Mission Priority: {priority}"
+        logger.info(f"Mission priority from reference data for ship {data['ship_name']}: {priority}")
+        return state
+
     messages = [
         SystemMessage(content="You are a tactical advisor for naval missions. Determine the priority of the mission based on the ship type and mission type."),
         HumanMessage(content=f"Ship Type: {data['ship_type']}, Mission Type: {data['mission_type']}. What is the priority of this mission? Provide answer under 10 words.")
@@ -267,12 +262,20 @@ def insert_crew_info_and_assess_readiness(state: SuperAgentState) -> SuperAgentS
                 commander_name=data['commander_name'],
                 commander_rank=data['commander_rank']
             )
+            # Bump the ship so incremental exports pick up the new crew row
+            ShipInformation.objects.filter(pk=ship.pk).update(updated_at=timezone.now())
     except Exception as e:
         logger.error(f"Error saving crew info for ship_id {data['ship_id']}: {e}", exc_info=True)
         state['error'] = f"Failed to save crew information: {e}"
         state['next'] = "END"
         return state
 
+    readiness = assess_crew_readiness(data['crew_size'], data['commander_rank'], data['ship_type'])
+    if readiness:
+        state['ICIA'] = f"Crew Readiness Assessment: {readiness}"
+        logger.info(f"Crew readiness from reference data for ship {data['ship_name']}: {readiness}")
+        return state
+
     messages = [
         SystemMessage(content="You are a naval operations analyst. Assess the readiness of the crew based on the crew size and commander's rank."),
         HumanMessage(content=f"Crew Size: {data['crew_size']}, Commander Rank: {data['commander_rank']}. Is the crew ready for the mission? Provide answer under 10 words.")
@@ -303,12 +306,19 @@ def insert_port_info_and_determine_strategic_advantage(state: SuperAgentState) -
                 ship=ship,
                 home_port=data['home_port']
             )
+            ShipInformation.objects.filter(pk=ship.pk).update(updated_at=timezone.now())
     except Exception as e:
         logger.error(f"Error saving port info for ship_id {data['ship_id']}: {e}", exc_info=True)
         state['error'] = f"Failed to save port information: {e}"
         state['next'] = "END"
         return state
 
+    advantage = assess_strategic_advantage(data['home_port'])
+    if advantage:
+        state['IPIA'] = f"Strategic Advantage: {advantage}"
+        logger.info(f"Strategic advantage from reference data for port {data['home_port']}: {advantage}")
+        return state
+
     messages = [
         SystemMessage(content="You are a strategic advisor for naval operations. Determine the strategic advantage of the home port for the mission."),
         HumanMessage(content=f"Home Port: {data['home_port']}. What is the strategic advantage of this port for the mission? Provide answer under 10 words.")
@@ -327,6 +337,10 @@ def answer_questions_node(state: SuperAgentState) -> SuperAgentState:
     questions = state.get('data', {}).get('question', [])
     answers = []
     for question in questions:
+        cached_answer = lookup_answer(question)
+        if cached_answer is not None:
+            answers.append(cached_answer)
+            continue
         messages = [
             SystemMessage(content="You are a helpful assistant."),
             HumanMessage(content=question)
@@ -334,6 +348,7 @@ def answer_questions_node(state: SuperAgentState) -> SuperAgentState:
         try:
             response = groq_llm.invoke(messages)
             answers.append(response.content)
+            store_answer(question, response.content)
         except Exception as e:
             logger.error(f"Error answering question '{question}': {e}", exc_info=True)
             answers.append(f"Error: {e}")
@@ -350,7 +365,7 @@ def Q_router_node(state: SuperAgentState) -> SuperAgentState:
 
 # Supergraph Workflow
 superflow = StateGraph(SuperAgentState)
-superflow.add_node("payload", payload_maker)
+superflow.add_node("analysis", analysis_node)
 superflow.add_node("router", router_node)
 superflow.add_node("ISIC_node", insert_ship_info_and_calculate_priority)
 superflow.add_node("ICIA_node", insert_crew_info_and_assess_readiness)
@@ -359,9 +374,9 @@ superflow.add_node("answer_questions_node", answer_questions_node)
 superflow.add_node("Q_router", Q_router_node)
 
 # Define edges
-superflow.set_entry_point("payload")
+superflow.set_entry_point("analysis")
 superflow.add_conditional_edges(
-    "payload",
+    "analysis",
     lambda x: x["next"],
     {"router": "router", "END": END}
 )
@@ -3,16 +3,30 @@ from django.shortcuts import render, redirect
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse, StreamingHttpResponse, HttpResponseBadRequest, Http404
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from .forms import ChatbotForm
 from .utils import supergraph
+from .concurrency import (
+    user_turn_lock, idempotency_cache_key, get_idempotent_result, store_idempotent_result,
+    mark_in_flight, clear_in_flight, wait_for_idempotent_result,
+    check_rate_limit, concurrency_slot, SATURATED_RETRY_AFTER, TURN_BUSY_RETRY_AFTER
+)
+from .exports import DATASETS, FORMATS, export_stream
+from .responses import wants_compact_api, compact_json_response
 from datetime import datetime
 import json
+import math
+import uuid
 from langgraph.errors import InvalidUpdateError
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
+NEXT_IDEMPOTENCY_KEY_HEADER = 'X-Next-Idempotency-Key'
+
 def register(request):
     if request.method == 'POST':
         form = UserCreationForm(request.POST)
@@ -47,6 +61,63 @@ def user_logout(request):
     logout(request)
     return redirect('Navy_registrar:login')
 
+def run_chatbot_turn(user_input: str, user) -> dict:
+    user_id = user.username
+    initial_state = {
+        "query": user_input,
+        "data": {},
+        "uid": user.pk,
+        "error": None,
+        "questions": [],
+        "answers": [],
+        "ISIC": "",
+        "ICIA": "",
+        "IPIA": "",
+        "next": None
+    }
+    try:
+        final_state = supergraph.invoke(
+            initial_state,
+            config={"configurable": {"thread_id": str(datetime.now().timestamp())}}
+        )
+        logger.debug(f"Final state for {user_id}: {final_state}")
+    except InvalidUpdateError as e:
+        logger.error(f"LangGraph concurrent update error: {e}", exc_info=True)
+        final_state = {"error": "Internal workflow error: concurrent state update"}
+    except Exception as e:
+        logger.error(f"Exception in supergraph.invoke: {e}", exc_info=True)
+        final_state = {"error": str(e)}
+    response = {}
+    if final_state["error"]:
+        response["message"] = f"Error: {final_state['error']}"
+        logger.error(f"Error in chatbot response for {user_id}: {final_state['error']}")
+    else:
+        response["data"] = final_state["data"]
+        if final_state.get("ISIC"):
+            response["mission_priority"] = final_state["ISIC"]
+        if final_state.get("ICIA"):
+            response["crew_readiness"] = final_state["ICIA"]
+        if final_state.get("IPIA"):
+            response["strategic_advantage"] = final_state["IPIA"]
+        if final_state.get("questions") and final_state.get("answers"):
+            response["questions_answers"] = [
+                {"question": q, "answer": a}
+                for q, a in zip(final_state["questions"], final_state["answers"])
+            ]
+        logger.info(f"Chatbot processed response for {user_id}")
+    return response
+
+def throttled_response(request, form, message: str, retry_after: float):
+    response = {"message": f"Error: {message}"}
+    if wants_compact_api(request):
+        http_response = compact_json_response(request, response, status=429)
+    elif request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        http_response = JsonResponse({'response': json.dumps(response, indent=2)}, status=429)
+    else:
+        http_response = render(request, 'chatbot.html', {'form': form, 'response': json.dumps(response, indent=2)}, status=429)
+    http_response['Retry-After'] = str(max(math.ceil(retry_after), 1))
+    return http_response
+
 @login_required
 def chatbot(request):
     if request.method == 'POST':
@@ -55,55 +126,81 @@ def chatbot(request):
             user_input = form.cleaned_data['user_input']
             user_id = request.user.username
             logger.debug(f"Chatbot input from {user_id}: {user_input}")
-            initial_state = {
-                "query": user_input,
-                "data": {},
-                "memory": {},
-                "uid": user_id,
-                "error": None,
-                "output": {'question_answer': {'questions': [], 'answers': []}},
-                "questions": [],
-                "answers": [],
-                "ISIC": "",
-                "ICIA": "",
-                "IPIA": "",
-                "next": None
-            }
-            try:
-                final_state = supergraph.invoke(
-                    initial_state,
-                    config={"configurable": {"thread_id": str(datetime.now().timestamp())}}
-                )
-                logger.debug(f"Final state for {user_id}: {final_state}")
-            except InvalidUpdateError as e:
-                logger.error(f"LangGraph concurrent update error: {e}", exc_info=True)
-                final_state = {"error": "Internal workflow error: concurrent state update"}
-            except Exception as e:
-                logger.error(f"Exception in supergraph.invoke: {e}", exc_info=True)
-                final_state = {"error": str(e)}
-            response = {}
-            if final_state["error"]:
-                response["message"] = f"Error: {final_state['error']}"
-                logger.error(f"Error in chatbot response for {user_id}: {final_state['error']}")
+            idempotency_key = request.headers.get('Idempotency-Key') or form.cleaned_data.get('idempotency_key')
+            cache_key = idempotency_cache_key(request.user.pk, idempotency_key, user_input) if idempotency_key else None
+            response = get_idempotent_result(cache_key)
+            if response is not None:
+                logger.info(f"Returning cached result for {user_id} (idempotency key {idempotency_key})")
             else:
-                response["data"] = final_state["data"]
-                if final_state.get("ISIC"):
-                    response["mission_priority"] = final_state["ISIC"]
-                if final_state.get("ICIA"):
-                    response["crew_readiness"] = final_state["ICIA"]
-                if final_state.get("IPIA"):
-                    response["strategic_advantage"] = final_state["IPIA"]
-                if final_state.get("questions") and final_state.get("answers"):
-                    response["questions_answers"] = [
-                        {"question": q, "answer": a}
-                        for q, a in zip(final_state["questions"], final_state["answers"])
-                    ]
-                logger.info(f"Chatbot processed response for {user_id}")
+                with user_turn_lock(request.user.pk) as acquired:
+                    if not acquired:
+                        # Only a duplicate of the running submission is worth waiting for
+                        response = wait_for_idempotent_result(cache_key)
+                        if response is None:
+                            logger.warning(f"Turn already in progress for {user_id}")
+                            return throttled_response(request, form, "Another request is still being processed, please retry shortly", TURN_BUSY_RETRY_AFTER)
+                        logger.info(f"Returning result of in-flight run for {user_id} (idempotency key {idempotency_key})")
+                    else:
+                        # Marked before admission so a duplicate arriving meanwhile waits for this run
+                        mark_in_flight(cache_key)
+                        try:
+                            # Take a slot before a token so a saturated deployment does not drain buckets
+                            with concurrency_slot(request.user) as admitted:
+                                if not admitted:
+                                    return throttled_response(request, form, "The assistant is busy, please retry shortly", SATURATED_RETRY_AFTER)
+                                retry_after = check_rate_limit(request.user)
+                                if retry_after is not None:
+                                    logger.warning(f"Rate limit exceeded for {user_id}, retry after {retry_after:.1f}s")
+                                    return throttled_response(request, form, "Too many requests, please slow down", retry_after)
+                                response = run_chatbot_turn(user_input, request.user)
+                                store_idempotent_result(cache_key, response)
+                        finally:
+                            clear_in_flight(cache_key)
+            # Every response carries a fresh key for the next submission
+            next_idempotency_key = uuid.uuid4().hex
+            # Handle API v2 request: structured object encoded once
+            if wants_compact_api(request):
+                http_response = compact_json_response(request, response)
+                http_response[NEXT_IDEMPOTENCY_KEY_HEADER] = next_idempotency_key
+                return http_response
             # Handle AJAX request
             if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-                return JsonResponse({'response': json.dumps(response, indent=2)})
+                http_response = JsonResponse({
+                    'response': json.dumps(response, indent=2),
+                    'idempotency_key': next_idempotency_key
+                })
+                http_response[NEXT_IDEMPOTENCY_KEY_HEADER] = next_idempotency_key
+                return http_response
             # Handle regular POST
+            form = ChatbotForm(initial={'user_input': user_input, 'idempotency_key': next_idempotency_key})
             return render(request, 'chatbot.html', {'form': form, 'response': json.dumps(response, indent=2)})
     else:
-        form = ChatbotForm()
-    return render(request, 'chatbot.html', {'form': form})
\ No newline at end of file
+        form = ChatbotForm(initial={'idempotency_key': uuid.uuid4().hex})
+    return render(request, 'chatbot.html', {'form': form})
+
+@staff_member_required
+def export(request, dataset):
+    if dataset not in DATASETS:
+        raise Http404(f"Unknown dataset: {dataset}")
+    fmt = request.GET.get('format', 'jsonl')
+    if fmt not in FORMATS:
+        return HttpResponseBadRequest(f"Unsupported format: {fmt}")
+    since = None
+    if request.GET.get('since'):
+        try:
+            since = parse_datetime(request.GET['since'])
+        except ValueError:
+            since = None
+        if since is None:
+            return HttpResponseBadRequest("Invalid 'since' timestamp")
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+    compress = request.GET.get('gzip') in ('1', 'true')
+    filename = f"{dataset}.{fmt}" + (".gz" if compress else "")
+    logger.info(f"Export of {dataset} requested by {request.user.username}")
+    response = StreamingHttpResponse(
+        export_stream(dataset, fmt=fmt, since=since, compress=compress),
+        content_type='application/gzip' if compress else FORMATS[fmt]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
\ No newline at end of file
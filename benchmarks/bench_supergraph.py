@@ -0,0 +1,176 @@
+"""Per-turn overhead of the supergraph with a stubbed LLM.
+
+Compares the current flat supergraph against the previous layout, where the
+analysis step ran as a nested graph with its own AgentState inside a
+``payload`` node. The LLM is replaced by a stub returning a fixed analysis, so
+the difference is graph runtime, state copying and checkpointing.
+
+Usage:
+    python benchmarks/bench_supergraph.py [--turns 200]
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import statistics
+from pathlib import Path
+from typing import TypedDict, Optional, Sequence
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Navy_Crew_Registration_Chatbot.settings')
+os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key')
+os.environ.setdefault('GROQ_API_KEY', 'benchmark-stub')
+
+import django
+
+django.setup()
+logging.disable(logging.CRITICAL)
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import setup_test_environment
+from langchain_core.messages import BaseMessage, HumanMessage
+from langgraph.graph import StateGraph, END
+from langgraph.checkpoint.memory import MemorySaver
+from Navy_registrar import utils
+
+STUB_ANALYSIS = {
+    "ship_name": "INS Arihant",
+    "ship_type": "Ballistic Missile Submarine",
+    "crew_size": 100,
+    "commander_name": "R. Kumar",
+    "commander_rank": "Captain",
+    "mission_type": "deterrence",
+    "home_port": "Visakhapatnam",
+    "question": [],
+}
+
+class StubResponse:
+    def __init__(self, content):
+        self.content = content
+
+class StubLLM:
+    def invoke(self, messages, **kwargs):
+        return StubResponse(json.dumps(STUB_ANALYSIS))
+
+# Previous layout: analysis nested in its own graph
+class LegacyAgentState(TypedDict):
+    query: str
+    data: dict
+    memory: dict
+    error: str
+    messages: Sequence[BaseMessage]
+    user_id: int
+
+class LegacySuperAgentState(utils.SuperAgentState):
+    memory: dict
+    output: Optional[dict]
+
+def legacy_analysis_node(state: LegacyAgentState) -> LegacyAgentState:
+    result = utils.analysis_node({**state, "uid": state["user_id"]})
+    return {**state, "data": result["data"], "error": result["error"]}
+
+legacy_analysis_workflow = StateGraph(LegacyAgentState)
+legacy_analysis_workflow.add_node("analysis", legacy_analysis_node)
+legacy_analysis_workflow.set_entry_point("analysis")
+legacy_analysis_workflow.add_edge("analysis", END)
+legacy_analysis_graph = legacy_analysis_workflow.compile()
+
+def legacy_payload_maker(state: LegacySuperAgentState) -> LegacySuperAgentState:
+    initial_agent_state = {
+        "query": state["query"],
+        "data": {},
+        "memory": {},
+        "error": None,
+        "messages": [HumanMessage(content=state["query"])],
+        "user_id": state["uid"]
+    }
+    final_agent_state = legacy_analysis_graph.invoke(initial_agent_state)
+    if final_agent_state["error"]:
+        state["error"] = final_agent_state["error"]
+        state["next"] = "END"
+    else:
+        state["data"] = final_agent_state["data"]
+        state["next"] = "router"
+    return state
+
+def build_legacy_supergraph():
+    flow = StateGraph(LegacySuperAgentState)
+    flow.add_node("payload", legacy_payload_maker)
+    flow.add_node("router", utils.router_node)
+    flow.add_node("ISIC_node", utils.insert_ship_info_and_calculate_priority)
+    flow.add_node("ICIA_node", utils.insert_crew_info_and_assess_readiness)
+    flow.add_node("IPIA_node", utils.insert_port_info_and_determine_strategic_advantage)
+    flow.add_node("answer_questions_node", utils.answer_questions_node)
+    flow.add_node("Q_router", utils.Q_router_node)
+    flow.set_entry_point("payload")
+    flow.add_conditional_edges("payload", lambda x: x["next"], {"router": "router", "END": END})
+    flow.add_edge("router", "ISIC_node")
+    flow.add_edge("ISIC_node", "ICIA_node")
+    flow.add_edge("ICIA_node", "Q_router")
+    flow.add_conditional_edges(
+        "Q_router",
+        lambda x: x["next"],
+        {"answer_questions_node": "answer_questions_node", "IPIA_node": "IPIA_node"}
+    )
+    flow.add_edge("IPIA_node", "answer_questions_node")
+    flow.add_edge("answer_questions_node", END)
+    return flow.compile(checkpointer=MemorySaver())
+
+def initial_state(user_pk: int, legacy: bool) -> dict:
+    state = {
+        "query": "Registering INS Arihant for a deterrence mission",
+        "data": {},
+        "uid": user_pk,
+        "error": None,
+        "questions": [],
+        "answers": [],
+        "ISIC": "",
+        "ICIA": "",
+        "IPIA": "",
+        "next": None
+    }
+    if legacy:
+        state.update({"memory": {}, "output": {'question_answer': {'questions': [], 'answers': []}}})
+    return state
+
+def run(graph, user_pk: int, turns: int, legacy: bool) -> list:
+    timings = []
+    for turn in range(turns):
+        start = time.perf_counter()
+        final_state = graph.invoke(
+            initial_state(user_pk, legacy),
+            config={"configurable": {"thread_id": f"{'legacy' if legacy else 'flat'}-{turn}"}}
+        )
+        timings.append(time.perf_counter() - start)
+        assert not final_state["error"], final_state["error"]
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--turns', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    utils.groq_llm = utils.analysis_llm = StubLLM()
+    user = User.objects.create_user(username='benchmark')
+
+    graphs = [("nested analysis graph", build_legacy_supergraph(), True), ("flat supergraph", utils.supergraph, False)]
+    results = {}
+    for name, graph, legacy in graphs:
+        run(graph, user.pk, 10, legacy)  # warm up
+        results[name] = run(graph, user.pk, args.turns, legacy)
+
+    for name, timings in results.items():
+        print(f"{name:>22}: mean {statistics.mean(timings) * 1000:.2f} ms, "
+              f"median {statistics.median(timings) * 1000:.2f} ms over {len(timings)} turns")
+    legacy_mean = statistics.mean(results["nested analysis graph"])
+    flat_mean = statistics.mean(results["flat supergraph"])
+    print(f"per-turn overhead reduction: {(legacy_mean - flat_mean) * 1000:.2f} ms "
+          f"({(legacy_mean - flat_mean) / legacy_mean:.1%})")
+
+if __name__ == '__main__':
+    main()
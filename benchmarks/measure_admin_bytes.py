@@ -0,0 +1,132 @@
+"""Static bytes transferred by admin pages before and after the static pipeline.
+
+Runs collectstatic twice into temporary directories: once with plain
+StaticFilesStorage (the previous setup) and once with WhiteNoise's
+CompressedManifestStaticFilesStorage (the current one). For each, it renders
+admin pages and fetches every stylesheet and script they reference through
+the test client, so the numbers are what WhiteNoiseMiddleware actually serves:
+
+- first load: each asset is requested with ``Accept-Encoding: gzip, br`` and
+  the served body is counted, with its ``Content-Encoding``. Identity bytes
+  (no ``Accept-Encoding``) are shown for comparison.
+- repeat load: assets whose ``Cache-Control`` is not ``immutable`` are
+  revalidated with a conditional request; the requests actually made and
+  their status codes are counted.
+
+Usage:
+    python benchmarks/measure_admin_bytes.py
+"""
+import os
+import re
+import sys
+import logging
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Navy_Crew_Registration_Chatbot.settings')
+os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key')
+os.environ.setdefault('GROQ_API_KEY', 'benchmark-stub')
+
+import django
+
+django.setup()
+logging.disable(logging.CRITICAL)
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment
+
+ADMIN_PAGES = [
+    '/admin/',
+    '/admin/Navy_registrar/shipinformation/',
+    '/admin/Navy_registrar/shipinformation/add/',
+]
+
+PIPELINES = [
+    ('before', 'django.contrib.staticfiles.storage.StaticFilesStorage'),
+    ('after', 'whitenoise.storage.CompressedManifestStaticFilesStorage'),
+]
+
+def static_urls(html: str) -> set:
+    static_prefix = re.escape('/' + settings.STATIC_URL.lstrip('/'))
+    return set(re.findall(rf'(?:src|href)="({static_prefix}[^"?#]+)', html))
+
+def served_bytes(response) -> int:
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+def fetch_asset(client: Client, url: str) -> dict:
+    identity = client.get(url)
+    assert identity.status_code == 200, f"{url} returned {identity.status_code}"
+    compressed = client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+    cache_control = compressed.get('Cache-Control', '')
+    revalidations = 0
+    if 'immutable' not in cache_control:
+        conditions = {}
+        if compressed.has_header('ETag'):
+            conditions['HTTP_IF_NONE_MATCH'] = compressed['ETag']
+        if compressed.has_header('Last-Modified'):
+            conditions['HTTP_IF_MODIFIED_SINCE'] = compressed['Last-Modified']
+        repeat = client.get(url, HTTP_ACCEPT_ENCODING='gzip, br', **conditions)
+        assert repeat.status_code in (200, 304), f"{url} revalidation returned {repeat.status_code}"
+        revalidations = 1
+    return {
+        'identity_bytes': served_bytes(identity),
+        'bytes': served_bytes(compressed),
+        'encoding': compressed.get('Content-Encoding', 'identity'),
+        'cache_control': cache_control,
+        'revalidations': revalidations,
+    }
+
+def measure(client: Client) -> list:
+    rows = []
+    for page in ADMIN_PAGES:
+        response = client.get(page)
+        assert response.status_code == 200, f"{page} returned {response.status_code}"
+        assets = [fetch_asset(client, url) for url in sorted(static_urls(response.content.decode()))]
+        rows.append({
+            'page': page,
+            'assets': len(assets),
+            'identity_bytes': sum(asset['identity_bytes'] for asset in assets),
+            'bytes': sum(asset['bytes'] for asset in assets),
+            'encodings': sorted({asset['encoding'] for asset in assets}),
+            'cache_control': sorted({asset['cache_control'] for asset in assets}),
+            'repeat_requests': sum(asset['revalidations'] for asset in assets),
+        })
+    return rows
+
+def main():
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    user = User.objects.create_superuser(username='benchmark', email='', password='benchmark-pass')
+
+    results = {}
+    for name, backend in PIPELINES:
+        with tempfile.TemporaryDirectory() as static_root:
+            storages = {**settings.STORAGES, 'staticfiles': {'BACKEND': backend}}
+            with override_settings(DEBUG=False, STATIC_ROOT=static_root, STORAGES=storages):
+                call_command('collectstatic', interactive=False, verbosity=0)
+                client = Client()
+                client.force_login(user)
+                results[name] = measure(client)
+
+    print(f"{'page':<45} {'assets':>6} {'identity KiB':>13} {'before KiB':>11} {'after KiB':>10} {'repeat-load requests':>22}")
+    for before, after in zip(results['before'], results['after']):
+        print(f"{before['page']:<45} {before['assets']:>6} {before['identity_bytes'] / 1024:>13.1f} "
+              f"{before['bytes'] / 1024:>11.1f} {after['bytes'] / 1024:>10.1f} "
+              f"{before['repeat_requests']:>10} -> {after['repeat_requests']}")
+    for name, rows in results.items():
+        print(f"{name}: Content-Encoding {', '.join(sorted({e for row in rows for e in row['encodings']}))}; "
+              f"Cache-Control {' | '.join(sorted({c for row in rows for c in row['cache_control']})) or '(none)'}")
+    total_before = sum(row['bytes'] for row in results['before'])
+    total_after = sum(row['bytes'] for row in results['after'])
+    print(f"first-load static bytes: {total_before / 1024:.1f} KiB -> {total_after / 1024:.1f} KiB "
+          f"({1 - total_after / total_before:.1%} less)")
+
+if __name__ == '__main__':
+    main()